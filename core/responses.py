@@ -0,0 +1,149 @@
+import hashlib
+import re
+
+from django.conf import settings
+from django.http import FileResponse, HttpResponse
+from django.utils.cache import get_conditional_response, patch_vary_headers
+from django.utils.http import http_date
+
+
+_RANGE_RE = re.compile(r'^bytes=(\d*)-(\d*)$')
+
+
+class _BoundedFile:
+    """Envuelve un archivo para leer solo `length` bytes desde `start`."""
+
+    def __init__(self, fileobj, start, length):
+        self.fileobj = fileobj
+        self.remaining = length
+        fileobj.seek(start)
+
+    def read(self, size=-1):
+        if self.remaining <= 0:
+            return b''
+        if size is None or size < 0 or size > self.remaining:
+            size = self.remaining
+        data = self.fileobj.read(size)
+        self.remaining -= len(data)
+        return data
+
+    def close(self):
+        self.fileobj.close()
+
+
+def parse_range(header, size):
+    """
+    Interpreta una cabecera Range con un único rango de bytes.
+    Retorna (inicio, fin) inclusivo, None si la cabecera no aplica
+    (se sirve el archivo completo) o False si el rango no es satisfacible.
+    """
+    if not header:
+        return None
+    match = _RANGE_RE.match(header.strip())
+    if not match:
+        # Rangos múltiples o unidades desconocidas: se ignora la cabecera
+        return None
+    first, last = match.groups()
+    if not first and not last:
+        return None
+    if not first:
+        suffix = int(last)
+        if suffix == 0:
+            return False
+        return max(size - suffix, 0), size - 1
+    start = int(first)
+    end = int(last) if last else size - 1
+    if start >= size or end < start:
+        return False
+    return start, min(end, size - 1)
+
+
+def serve_blob(request, storage, digest, content_type, filename=None, as_attachment=False, cache_control=None):
+    """
+    Entrega un blob en streaming con soporte de HTTP Range.
+    Si settings.BLOB_SENDFILE_MODE está configurado delega la entrega al
+    servidor web mediante X-Accel-Redirect (nginx) o X-Sendfile (apache).
+    """
+    etag = f'"{digest}"'
+    # El contenido de un blob nunca cambia: basta comparar el ETag
+    if request.META.get('HTTP_IF_NONE_MATCH') == etag:
+        response = HttpResponse(status=304)
+        response['ETag'] = etag
+        if cache_control:
+            response['Cache-Control'] = cache_control
+        return response
+
+    mode = getattr(settings, 'BLOB_SENDFILE_MODE', None)
+    handoff = None
+    if mode == 'x-accel-redirect':
+        handoff = ('X-Accel-Redirect', storage.internal_url(digest))
+    elif mode == 'x-sendfile':
+        handoff = ('X-Sendfile', storage.path(digest))
+
+    if handoff and handoff[1]:
+        response = HttpResponse(content_type=content_type)
+        response[handoff[0]] = handoff[1]
+    else:
+        size = storage.size(digest)
+        byte_range = parse_range(request.META.get('HTTP_RANGE'), size)
+        if_range = request.META.get('HTTP_IF_RANGE')
+        if if_range and if_range != etag:
+            byte_range = None
+
+        if byte_range is False:
+            response = HttpResponse(status=416)
+            response['Content-Range'] = f'bytes */{size}'
+            return response
+
+        fileobj = storage.open(digest)
+        if byte_range is None:
+            response = FileResponse(
+                fileobj, content_type=content_type, as_attachment=as_attachment, filename=filename or ''
+            )
+            response['Content-Length'] = size
+        else:
+            start, end = byte_range
+            length = end - start + 1
+            response = FileResponse(
+                _BoundedFile(fileobj, start, length),
+                status=206,
+                content_type=content_type,
+                as_attachment=as_attachment,
+                filename=filename or '',
+            )
+            response['Content-Range'] = f'bytes {start}-{end}/{size}'
+            response['Content-Length'] = length
+        response['Accept-Ranges'] = 'bytes'
+
+    response['ETag'] = etag
+    if cache_control:
+        response['Cache-Control'] = cache_control
+    return response
+
+
+def make_etag(*parts):
+    """ETag fuerte a partir de datos de versión baratos (sin serializar la respuesta)."""
+    return '"%s"' % hashlib.sha1('|'.join(str(part) for part in parts).encode()).hexdigest()
+
+
+def not_modified(request, etag, last_modified=None):
+    """
+    Responde 304 si If-None-Match / If-Modified-Since indican que el cliente
+    ya tiene la versión actual. Retorna None si hay que enviar el cuerpo.
+    """
+    timestamp = int(last_modified.timestamp()) if last_modified else None
+    response = get_conditional_response(request, etag=etag, last_modified=timestamp)
+    if response is not None:
+        add_validators(response, etag, last_modified)
+    return response
+
+
+def add_validators(response, etag, last_modified=None, cache_control=None):
+    response['ETag'] = etag
+    if last_modified:
+        response['Last-Modified'] = http_date(last_modified.timestamp())
+    if cache_control:
+        response['Cache-Control'] = cache_control
+    # La respuesta depende de quién la pide
+    patch_vary_headers(response, ('Authorization', 'Cookie'))
+    return response
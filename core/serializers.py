@@ -0,0 +1,96 @@
+from django.core.exceptions import FieldDoesNotExist
+from rest_framework.permissions import SAFE_METHODS
+
+
+def _split(value):
+    return {name.strip() for name in (value or '').split(',') if name.strip()}
+
+
+def fieldset_key(request):
+    """Parte de las claves de caché / ETags que depende de ?fields= y ?omit=."""
+    if request is None:
+        return ''
+    params = request.query_params
+    return f"{','.join(sorted(_split(params.get('fields'))))}|{','.join(sorted(_split(params.get('omit'))))}"
+
+
+class DynamicFieldsMixin:
+    """
+    Sparse fieldsets: ?fields=a,b devuelve solo esos campos y ?omit=c los
+    excluye. Los campos no pedidos se quitan antes de serializar, así sus
+    SerializerMethodField nunca se ejecutan, y `narrow_queryset` evita traer
+    sus columnas de la base de datos.
+
+    En Meta se puede declarar:
+      - field_sources: columnas que necesita cada campo calculado.
+      - field_prefetches: prefetch (lookup o to_attr) que usa cada campo.
+      - always_columns: columnas que siempre se cargan (p. ej. las de orden).
+    """
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        selected = self.get_selected_fields(self.context.get('request'))
+        if selected is not None:
+            for name in set(self.fields) - selected:
+                self.fields.pop(name)
+
+    @classmethod
+    def get_selected_fields(cls, request):
+        """Campos pedidos por el cliente, o None si se piden todos."""
+        if request is None or request.method not in SAFE_METHODS:
+            return None
+        params = request.query_params
+        only = _split(params.get('fields'))
+        omit = _split(params.get('omit'))
+        if not only and not omit:
+            return None
+        names = set(cls(context={}).fields)
+        selected = (only & names) if only else names
+        return selected - omit
+
+    @classmethod
+    def get_required_columns(cls, selected):
+        meta = cls.Meta
+        opts = meta.model._meta
+        sources = getattr(meta, 'field_sources', {})
+        columns = {opts.pk.name, *getattr(meta, 'always_columns', ())}
+        fields = cls(context={}).fields
+        for name in selected:
+            if name in sources:
+                columns.update(sources[name])
+                continue
+            try:
+                model_field = opts.get_field(fields[name].source.split('.')[0])
+            except FieldDoesNotExist:
+                # Campos calculados o '*': no corresponden a una columna
+                continue
+            if model_field.concrete:
+                columns.add(model_field.name)
+        return columns
+
+    @classmethod
+    def narrow_queryset(cls, queryset, request):
+        """Limita el queryset a las columnas y relaciones que piden los campos elegidos."""
+        selected = cls.get_selected_fields(request)
+        if selected is None:
+            return queryset
+        columns = cls.get_required_columns(selected)
+
+        select_related = queryset.query.select_related
+        if isinstance(select_related, dict):
+            keep = [name for name in select_related if name in columns]
+            if len(keep) != len(select_related):
+                queryset = queryset.select_related(None)
+                if keep:
+                    queryset = queryset.select_related(*keep)
+
+        prefetches = getattr(cls.Meta, 'field_prefetches', {})
+        unused = {attr for name, attrs in prefetches.items() if name not in selected for attr in attrs}
+        if unused:
+            lookups = [
+                lookup for lookup in queryset._prefetch_related_lookups
+                if (getattr(lookup, 'to_attr', None) or getattr(lookup, 'prefetch_to', lookup)) not in unused
+            ]
+            queryset = queryset.prefetch_related(None).prefetch_related(*lookups)
+
+        return queryset.only(*columns)
@@ -119,6 +119,19 @@ DATABASES = {
 }
 
 
+# Caché
+# Sin REDIS_URL se usa la caché en memoria de cada proceso: las versiones del
+# catálogo no se comparten entre workers y la invalidación tarda hasta que
+# expiran las entradas. En producción conviene definir REDIS_URL (requiere redis).
+if os.getenv('REDIS_URL'):
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.redis.RedisCache',
+            'LOCATION': os.getenv('REDIS_URL'),
+        }
+    }
+
+
 AUTH_USER_MODEL = 'users.User'
 
 
@@ -180,3 +193,28 @@ CORS_ALLOW_CREDENTIALS = True
 # Archivos multimedia (subidas de usuarios, PDFs, imágenes, etc.)
 MEDIA_URL = '/media/'
 MEDIA_ROOT = BASE_DIR / 'media'
+
+# Almacenamiento de blobs direccionados por SHA-256 (PDFs de lecciones, portadas)
+BLOB_STORAGES = {
+    'lessons': {
+        'BACKEND': 'core.storage.LocalBlobStorage',
+        'OPTIONS': {
+            'location': MEDIA_ROOT / 'blobs' / 'lessons',
+            'internal_prefix': '/protected/blobs/lessons/',
+        },
+    },
+    'covers': {
+        'BACKEND': 'core.storage.LocalBlobStorage',
+        'OPTIONS': {
+            'location': MEDIA_ROOT / 'blobs' / 'covers',
+            'internal_prefix': '/protected/blobs/covers/',
+        },
+    },
+}
+# Delegar la entrega de archivos al servidor web: 'x-accel-redirect' (nginx) o 'x-sendfile' (apache)
+BLOB_SENDFILE_MODE = os.getenv('BLOB_SENDFILE_MODE') or None
+
+# Subida por partes de PDFs de lecciones
+LESSON_UPLOAD_TEMP_DIR = MEDIA_ROOT / 'uploads'
+LESSON_UPLOAD_CHUNK_SIZE = 4 * 1024 * 1024
+LESSON_UPLOAD_MAX_SIZE = int(os.getenv('LESSON_UPLOAD_MAX_SIZE', 200 * 1024 * 1024))
@@ -0,0 +1,121 @@
+import functools
+import hashlib
+import os
+import re
+import tempfile
+from pathlib import Path
+
+from django.conf import settings
+from django.core.exceptions import ImproperlyConfigured
+from django.utils.module_loading import import_string
+
+
+CHUNK_SIZE = 64 * 1024
+_DIGEST_RE = re.compile(r'^[0-9a-f]{64}$')
+
+
+def is_valid_digest(digest):
+    return bool(digest) and bool(_DIGEST_RE.match(digest))
+
+
+class BlobStorage:
+    """
+    Interfaz de almacenamiento de contenido binario direccionado por su SHA-256.
+    Dos contenidos idénticos comparten el mismo blob.
+    """
+
+    def save(self, stream):
+        """Guarda el contenido leído de `stream` y retorna (sha256, tamaño)."""
+        raise NotImplementedError
+
+    def open(self, digest):
+        raise NotImplementedError
+
+    def exists(self, digest):
+        raise NotImplementedError
+
+    def size(self, digest):
+        raise NotImplementedError
+
+    def delete(self, digest):
+        raise NotImplementedError
+
+    def path(self, digest):
+        """Ruta local del blob (para X-Sendfile) o None si no aplica."""
+        return None
+
+    def internal_url(self, digest):
+        """URI interna del blob (para X-Accel-Redirect) o None si no aplica."""
+        return None
+
+
+class LocalBlobStorage(BlobStorage):
+    """Guarda los blobs en disco como <location>/ab/cd/<sha256>."""
+
+    def __init__(self, location, internal_prefix=None):
+        self.location = Path(location)
+        self.internal_prefix = internal_prefix
+
+    def _relative(self, digest):
+        if not is_valid_digest(digest):
+            raise ValueError('Identificador de blob inválido.')
+        return f'{digest[:2]}/{digest[2:4]}/{digest}'
+
+    def path(self, digest):
+        return str(self.location / self._relative(digest))
+
+    def internal_url(self, digest):
+        if not self.internal_prefix:
+            return None
+        return self.internal_prefix.rstrip('/') + '/' + self._relative(digest)
+
+    def save(self, stream):
+        tmp_dir = self.location / 'tmp'
+        tmp_dir.mkdir(parents=True, exist_ok=True)
+        hasher = hashlib.sha256()
+        size = 0
+        fd, tmp_path = tempfile.mkstemp(dir=tmp_dir)
+        try:
+            with os.fdopen(fd, 'wb') as out:
+                while True:
+                    chunk = stream.read(CHUNK_SIZE)
+                    if not chunk:
+                        break
+                    hasher.update(chunk)
+                    out.write(chunk)
+                    size += len(chunk)
+            digest = hasher.hexdigest()
+            final_path = Path(self.path(digest))
+            if final_path.exists():
+                os.remove(tmp_path)
+            else:
+                final_path.parent.mkdir(parents=True, exist_ok=True)
+                os.replace(tmp_path, final_path)
+        except BaseException:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+            raise
+        return digest, size
+
+    def open(self, digest):
+        return open(self.path(digest), 'rb')
+
+    def exists(self, digest):
+        return is_valid_digest(digest) and os.path.exists(self.path(digest))
+
+    def size(self, digest):
+        return os.path.getsize(self.path(digest))
+
+    def delete(self, digest):
+        if self.exists(digest):
+            os.remove(self.path(digest))
+
+
+@functools.lru_cache(maxsize=None)
+def get_blob_storage(name):
+    """Instancia el backend configurado en settings.BLOB_STORAGES[name]."""
+    config = getattr(settings, 'BLOB_STORAGES', {}).get(name)
+    if config is None:
+        raise ImproperlyConfigured(f"No hay almacenamiento de blobs configurado para '{name}'.")
+    backend = import_string(config.get('BACKEND', 'core.storage.LocalBlobStorage'))
+    return backend(**config.get('OPTIONS', {}))
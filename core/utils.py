@@ -0,0 +1,14 @@
+import base64
+import binascii
+
+from django.core.exceptions import ValidationError
+
+
+def decode_base64_file(value):
+    """Decodifica un archivo en base64, aceptando también el formato data URI."""
+    if value.startswith('data:') and ',' in value:
+        value = value.split(',', 1)[1]
+    try:
+        return base64.b64decode(''.join(value.split()), validate=True)
+    except (binascii.Error, ValueError):
+        raise ValidationError("El archivo no es un base64 válido.")
@@ -0,0 +1,115 @@
+import hashlib
+import time
+
+from django.core.cache import cache
+
+
+CATALOG_VERSION_KEY = 'courses:catalog:version'
+POPULARITY_VERSION_KEY = 'courses:catalog:popularity:version'
+COURSE_VERSION_KEY = 'courses:course:{}:version'
+LEADERBOARD_VERSION_KEY = 'games:leaderboard:{}:version'
+STATS_KEY = 'courses:cache:{}:{}'
+RESPONSE_TIMEOUT = 300
+
+
+def _get_version(key):
+    version = cache.get(key)
+    if version is None:
+        # Se parte de un valor basado en el reloj para no reutilizar versiones
+        # antiguas si la clave fue expulsada de la caché.
+        cache.add(key, int(time.time() * 1000), None)
+        version = cache.get(key)
+    return version
+
+
+def _bump_version(key):
+    try:
+        cache.incr(key)
+    except ValueError:
+        _get_version(key)
+
+
+def get_catalog_version():
+    """
+    Versión global del catálogo. Las claves de caché la incluyen, así que
+    incrementarla invalida de una vez todo lo cacheado del catálogo.
+    """
+    return _get_version(CATALOG_VERSION_KEY)
+
+
+def bump_catalog_version():
+    _bump_version(CATALOG_VERSION_KEY)
+
+
+def get_popularity_version():
+    """
+    Versión del orden por popularidad: cambia con cada suscripción. Solo forma
+    parte de la clave de las páginas ?ordering=popular; en las demás,
+    subscriber_count puede quedar atrasado hasta RESPONSE_TIMEOUT.
+    """
+    return _get_version(POPULARITY_VERSION_KEY)
+
+
+def bump_popularity_version():
+    _bump_version(POPULARITY_VERSION_KEY)
+
+
+def get_course_version(course_id):
+    """Versión de un curso: cambia con el curso, sus lecciones y sus juegos."""
+    return _get_version(COURSE_VERSION_KEY.format(course_id))
+
+
+def bump_course_version(course_id):
+    _bump_version(COURSE_VERSION_KEY.format(course_id))
+
+
+def get_leaderboard_version(game_id):
+    """Versión del ranking de un juego: cambia cuando alguien mejora su mejor resultado."""
+    return _get_version(LEADERBOARD_VERSION_KEY.format(game_id))
+
+
+def bump_leaderboard_version(game_id):
+    _bump_version(LEADERBOARD_VERSION_KEY.format(game_id))
+
+
+def make_key(prefix, *parts):
+    digest = hashlib.md5('|'.join(str(part) for part in parts).encode()).hexdigest()
+    return f'courses:{prefix}:{digest}'
+
+
+def _count(name, outcome):
+    key = STATS_KEY.format(name, outcome)
+    try:
+        cache.incr(key)
+    except ValueError:
+        cache.add(key, 0, None)
+        cache.incr(key)
+
+
+def get_or_build(name, key, build, timeout=RESPONSE_TIMEOUT):
+    """
+    Retorna (datos, hit). Si la clave no está en caché llama a `build()` y
+    guarda el resultado. Registra aciertos y fallos por nombre de caché.
+    """
+    data = cache.get(key)
+    if data is not None:
+        _count(name, 'hits')
+        return data, True
+    _count(name, 'misses')
+    data = build()
+    cache.set(key, data, timeout)
+    return data, False
+
+
+def get_cache_stats(names=('catalog', 'detail')):
+    stats = {}
+    for name in names:
+        hits = cache.get(STATS_KEY.format(name, 'hits'), 0)
+        misses = cache.get(STATS_KEY.format(name, 'misses'), 0)
+        total = hits + misses
+        stats[name] = {
+            'hits': hits,
+            'misses': misses,
+            'hit_rate': round(hits / total, 4) if total else None,
+        }
+    return stats
@@ -0,0 +1,189 @@
+"""
+Inscripción masiva de estudiantes a un curso a partir de una lista de correos.
+Los correos se procesan por lotes: cada lote resuelve usuarios y suscripciones
+con consultas IN y escribe con un bulk_create + un UPDATE.
+"""
+import csv
+import io
+
+from django.contrib.auth import get_user_model
+from django.core.exceptions import ValidationError
+from django.core.validators import validate_email
+from django.db import connection, transaction
+from django.db.models.functions import Lower
+from django.utils import timezone
+from rest_framework.exceptions import ParseError
+from rest_framework.parsers import BaseParser
+
+from .models import CourseSubscription
+from .stats import record_subscription_change
+from .subscriptions import invalidate_subscriptions
+
+
+MAX_ROWS = 50000
+BATCH_SIZE = 1000
+REPORT_HEADER = ('row', 'email', 'result')
+
+
+class CSVTextParser(BaseParser):
+    """Cuerpo text/csv: se entrega como texto para leerlo con `parse_emails`."""
+    media_type = 'text/csv'
+
+    def parse(self, stream, media_type=None, parser_context=None):
+        encoding = (parser_context or {}).get('encoding', 'utf-8')
+        try:
+            return stream.read().decode(encoding)
+        except UnicodeDecodeError:
+            # Excel suele exportar en Latin-1 / Windows-1252
+            raise ParseError(f'El CSV debe estar codificado en {encoding.upper()}.')
+
+
+def parse_emails(data):
+    """
+    Correos de la petición: lista JSON, {"emails": [...]}, texto CSV o un
+    archivo CSV en el campo `file`. En CSV se usa la columna `email` si hay
+    cabecera, o la primera columna si no.
+    """
+    if isinstance(data, str):
+        return _read_csv(data)
+    if isinstance(data, list):
+        return data
+    upload = data.get('file') if hasattr(data, 'get') else None
+    if upload is not None:
+        try:
+            return _read_csv(upload.read().decode('utf-8-sig'))
+        except UnicodeDecodeError:
+            raise ValidationError('El archivo CSV debe estar codificado en UTF-8.')
+    emails = data.get('emails') if hasattr(data, 'get') else None
+    if isinstance(emails, list):
+        return emails
+    raise ValidationError('Envíe una lista de correos, {"emails": [...]} o un CSV.')
+
+
+def _read_csv(text):
+    rows = [row for row in csv.reader(io.StringIO(text)) if row and any(cell.strip() for cell in row)]
+    if not rows:
+        return []
+    header = [cell.strip().lower() for cell in rows[0]]
+    if 'email' in header:
+        column = header.index('email')
+        return [row[column] if column < len(row) else '' for row in rows[1:]]
+    return [row[0] for row in rows]
+
+
+def enroll_emails(course, emails, batch_size=BATCH_SIZE):
+    """
+    Inscribe los correos en el curso y produce una fila de reporte
+    (fila, correo, resultado) por cada entrada, lote a lote.
+    """
+    yield REPORT_HEADER
+    seen = set()
+    for start in range(0, len(emails), batch_size):
+        batch = emails[start:start + batch_size]
+        results = {}
+        pending = {}
+        for offset, raw in enumerate(batch, start=start + 1):
+            email = str(raw or '').strip().lower()
+            try:
+                validate_email(email)
+            except ValidationError:
+                results[offset] = (raw, 'invalid_email')
+                continue
+            if email in seen:
+                results[offset] = (email, 'duplicate')
+                continue
+            seen.add(email)
+            pending[offset] = email
+        results.update(_enroll_batch(course, pending, batch))
+        for row in sorted(results):
+            yield (row, *results[row])
+
+
+def _enroll_batch(course, pending, raw_batch):
+    User = get_user_model()
+    if not pending:
+        return {}
+    # Primero coincidencia exacta (tal como llegó y en minúsculas); solo los
+    # correos que no aparecen se buscan sin distinguir mayúsculas
+    lookup = set(pending.values()) | {str(raw).strip() for raw in raw_batch if raw}
+    users = {}
+    for user_id, email, rol in User.objects.filter(email__in=lookup).values_list('id', 'email', 'rol'):
+        users.setdefault(email.lower(), (user_id, rol))
+    unresolved = set(pending.values()) - set(users)
+    if unresolved:
+        for user_id, email, rol in (
+            User.objects.annotate(email_lower=Lower('email'))
+            .filter(email_lower__in=unresolved)
+            .values_list('id', 'email', 'rol')
+        ):
+            users.setdefault(email.lower(), (user_id, rol))
+
+    students = {email: info[0] for email, info in users.items() if info[1] == '2'}
+    now = timezone.now()
+    with transaction.atomic():
+        # Las filas existentes quedan bloqueadas hasta el final del lote
+        existing = dict(
+            CourseSubscription.objects.select_for_update()
+            .filter(course=course, user_id__in=students.values())
+            .values_list('user_id', 'is_active')
+        )
+        new = _insert_subscriptions(
+            course.pk, [user_id for user_id in students.values() if user_id not in existing], now,
+        )
+        inactive = [user_id for user_id, active in existing.items() if not active]
+        if inactive:
+            CourseSubscription.objects.filter(course=course, user_id__in=inactive).update(
+                is_active=True, updated_at=now,
+            )
+        record_subscription_change(course.pk, len(new) + len(inactive))
+    invalidate_subscriptions(*new, *inactive)
+
+    results = {}
+    for row, email in pending.items():
+        if email not in users:
+            results[row] = (email, 'not_found')
+        elif email not in students:
+            results[row] = (email, 'not_student')
+        elif students[email] in new:
+            results[row] = (email, 'enrolled')
+        elif not existing.get(students[email], True):
+            results[row] = (email, 'reactivated')
+        else:
+            results[row] = (email, 'already_enrolled')
+    return results
+
+
+# bulk_create(ignore_conflicts=True) no dice qué filas insertó: si otra
+# petición inscribe al mismo usuario a la vez se contaría dos veces.
+_SUBSCRIPTION_INSERT = """
+INSERT INTO {table} (user_id, course_id, is_active, created_at, updated_at)
+VALUES {values}
+ON CONFLICT (user_id, course_id) DO NOTHING
+RETURNING user_id
+"""
+
+
+def _insert_subscriptions(course_id, user_ids, now):
+    """Crea las suscripciones que falten y devuelve los user_id realmente insertados."""
+    if not user_ids:
+        return set()
+    sql = _SUBSCRIPTION_INSERT.format(
+        table=CourseSubscription._meta.db_table,
+        values=', '.join(['(%s, %s, TRUE, %s, %s)'] * len(user_ids)),
+    )
+    params = [value for user_id in user_ids for value in (user_id, course_id, now, now)]
+    with connection.cursor() as cursor:
+        cursor.execute(sql, params)
+        return {user_id for (user_id,) in cursor.fetchall()}
+
+
+class _Echo:
+    def write(self, value):
+        return value
+
+
+def report_lines(rows):
+    """Convierte las filas del reporte en líneas CSV para StreamingHttpResponse."""
+    writer = csv.writer(_Echo())
+    for row in rows:
+        yield writer.writerow(row)
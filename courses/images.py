@@ -0,0 +1,69 @@
+import io
+
+from django.core.exceptions import ValidationError
+from PIL import Image, ImageOps, UnidentifiedImageError
+
+from core.storage import get_blob_storage
+from core.utils import decode_base64_file
+
+
+# Variantes de la portada: nombre -> ancho máximo en píxeles
+COVER_VARIANTS = (
+    ('thumbnail', 320),
+    ('card', 640),
+    ('hero', 1280),
+)
+COVER_FORMATS = {
+    'webp': ('WEBP', 'image/webp', {'quality': 80, 'method': 4}),
+    'jpg': ('JPEG', 'image/jpeg', {'quality': 85, 'optimize': True, 'progressive': True}),
+}
+
+
+def is_inline_image(value):
+    """True si la portada viene embebida (base64 / data URI) y no como URL."""
+    return bool(value) and not value.startswith(('http://', 'https://', '/'))
+
+
+def process_cover_image(data):
+    """
+    Decodifica la imagen una sola vez y genera las variantes de ancho fijo en
+    WebP y JPEG dentro del almacenamiento de blobs. Retorna el diccionario que
+    se guarda en Course.imagen_variantes.
+    """
+    try:
+        with Image.open(io.BytesIO(data)) as source:
+            image = ImageOps.exif_transpose(source)
+            if image.mode not in ('RGB', 'L'):
+                # JPEG no admite transparencia: se compone sobre fondo blanco
+                background = Image.new('RGB', image.size, (255, 255, 255))
+                rgba = image.convert('RGBA')
+                background.paste(rgba, mask=rgba.getchannel('A'))
+                image = background
+            image = image.convert('RGB')
+    except (UnidentifiedImageError, OSError, Image.DecompressionBombError):
+        raise ValidationError("La imagen de portada no es válida.")
+
+    storage = get_blob_storage('covers')
+    variants = {}
+    for name, width in COVER_VARIANTS:
+        resized = image
+        if image.width > width:
+            height = max(1, round(image.height * width / image.width))
+            resized = image.resize((width, height), Image.Resampling.LANCZOS)
+        entry = {'width': resized.width, 'height': resized.height}
+        for fmt, (pil_format, _, options) in COVER_FORMATS.items():
+            buffer = io.BytesIO()
+            resized.save(buffer, pil_format, **options)
+            buffer.seek(0)
+            entry[fmt], _ = storage.save(buffer)
+        variants[name] = entry
+    return variants
+
+
+def process_inline_cover(course):
+    """Procesa la portada embebida del curso (sin guardar). Retorna True si hubo cambios."""
+    if not is_inline_image(course.imagen_portada):
+        return False
+    course.imagen_variantes = process_cover_image(decode_base64_file(course.imagen_portada))
+    course.imagen_portada = None
+    return True
@@ -0,0 +1,110 @@
+import json
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, transaction
+
+from courses.models import Course, CourseSubscription
+from lessons.models import LessonProgress
+
+
+def hot_queries():
+    """(descripción, queryset, columnas del índice esperado) de las consultas más frecuentes."""
+    return [
+        (
+            'Curso por código público',
+            Course.objects.filter(codigo='X', estado='publicado'),
+            ['code'],
+        ),
+        (
+            'Catálogo público por fecha',
+            Course.objects.filter(estado='publicado').order_by('-created_at')[:12],
+            ['status', 'created_at'],
+        ),
+        (
+            'Catálogo público por popularidad',
+            Course.objects.filter(estado='publicado').order_by('-active_subscriber_count', '-created_at')[:12],
+            ['status', 'active_subscriber_count', 'created_at'],
+        ),
+        (
+            'Cursos del profesor por fecha',
+            Course.objects.filter(profesor_id=1).order_by('-created_at')[:12],
+            ['professor_id', 'created_at'],
+        ),
+        (
+            'Catálogo por categoría y nivel',
+            Course.objects.filter(categoria='X', nivel='basico'),
+            ['category', 'level'],
+        ),
+        (
+            'Suscripciones activas del usuario',
+            CourseSubscription.objects.filter(user_id=1, is_active=True),
+            ['user_id', 'is_active'],
+        ),
+        (
+            'Progreso de una lección del usuario',
+            LessonProgress.objects.filter(user_id=1, lesson_id=1),
+            ['user_id', 'lesson_id'],
+        ),
+    ]
+
+
+def plan_indexes(node):
+    """Nombres de índices usados en un plan de EXPLAIN (FORMAT JSON)."""
+    found = set()
+    if 'Index Name' in node:
+        found.add(node['Index Name'])
+    for child in node.get('Plans', []):
+        found |= plan_indexes(child)
+    return found
+
+
+def disable_seqscan(cursor):
+    """
+    Con tablas pequeñas el planificador prefiere el recorrido secuencial; al
+    desactivarlo se comprueba que el índice existe y es utilizable. Debe
+    ejecutarse dentro de una transacción.
+    """
+    cursor.execute('SET LOCAL enable_seqscan = off')
+
+
+def explain_indexes(cursor, queryset, columns):
+    """(índices usados por el plan, índices cuyas primeras columnas son `columns`)."""
+    table = queryset.model._meta.db_table
+    constraints = connection.introspection.get_constraints(cursor, table)
+    expected = {
+        name for name, info in constraints.items()
+        if (info['index'] or info['unique']) and info['columns'][:len(columns)] == columns
+    }
+    sql, params = queryset.query.sql_with_params()
+    cursor.execute('EXPLAIN (FORMAT JSON) ' + sql, params)
+    plan = cursor.fetchone()[0]
+    if isinstance(plan, str):
+        plan = json.loads(plan)
+    return plan_indexes(plan[0]['Plan']), expected
+
+
+class Command(BaseCommand):
+    help = (
+        'Verifica con EXPLAIN que las consultas más frecuentes usan sus índices '
+        '(solo PostgreSQL). Sale con error si alguna no lo hace.'
+    )
+
+    def handle(self, *args, **options):
+        if connection.vendor != 'postgresql':
+            raise CommandError('Esta verificación requiere PostgreSQL.')
+
+        failures = 0
+        with transaction.atomic(), connection.cursor() as cursor:
+            disable_seqscan(cursor)
+            for label, queryset, columns in hot_queries():
+                used, expected = explain_indexes(cursor, queryset, columns)
+                if used & expected:
+                    self.stdout.write(f'OK    {label}: {", ".join(sorted(used & expected))}')
+                else:
+                    failures += 1
+                    detail = ', '.join(sorted(used)) or 'recorrido secuencial'
+                    self.stderr.write(f'FALLA {label}: se esperaba un índice sobre {columns}, usa {detail}')
+
+        if failures:
+            raise CommandError(f'{failures} consultas no usan el índice esperado.')
+        self.stdout.write(self.style.SUCCESS('Todas las consultas usan sus índices.'))
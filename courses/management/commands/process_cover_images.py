@@ -0,0 +1,24 @@
+from django.core.exceptions import ValidationError
+from django.core.management.base import BaseCommand
+
+from courses.images import process_inline_cover
+from courses.models import Course
+
+
+class Command(BaseCommand):
+    help = 'Genera las variantes WebP/JPEG de las portadas guardadas en base64.'
+
+    def handle(self, *args, **options):
+        pending = Course.objects.filter(imagen_variantes__isnull=True, imagen_portada__isnull=False).values_list('pk', flat=True)
+        processed = failed = 0
+        for pk in list(pending):
+            # Una portada a la vez para no cargar todas las imágenes en memoria
+            course = Course.objects.only('id', 'imagen_portada', 'imagen_variantes').get(pk=pk)
+            try:
+                if process_inline_cover(course):
+                    course.save(update_fields=['imagen_portada', 'imagen_variantes'])
+                    processed += 1
+            except ValidationError:
+                failed += 1
+                self.stderr.write(f'Curso {pk}: la portada no es una imagen válida.')
+        self.stdout.write(self.style.SUCCESS(f'{processed} portadas procesadas, {failed} con errores.'))
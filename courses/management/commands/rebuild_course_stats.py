@@ -0,0 +1,17 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from courses.stats import rebuild_lesson_stats, refresh_course_stats
+
+
+class Command(BaseCommand):
+    help = 'Recalcula por completo CourseStats y LessonStats a partir de suscripciones y progreso.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--course', type=int, action='append', dest='courses', help='Limita a estos cursos (id).')
+
+    def handle(self, *args, **options):
+        with transaction.atomic():
+            courses = refresh_course_stats(options['courses'])
+            lessons = rebuild_lesson_stats(options['courses'])
+        self.stdout.write(self.style.SUCCESS(f'Estadísticas recalculadas: {courses} cursos, {lessons} lecciones.'))
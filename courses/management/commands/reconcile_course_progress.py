@@ -0,0 +1,101 @@
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand
+from django.db.models import Count, Exists, F, OuterRef, Subquery, Value
+from django.db.models.functions import Coalesce
+from django.utils import timezone
+
+from courses.models import Course, CourseProgress
+from courses.utils import update_course_progress
+from lessons.models import Lesson, LessonProgress
+
+
+def lesson_total(course_ref):
+    return (
+        Lesson.objects.filter(course=OuterRef(course_ref))
+        .order_by().values('course').annotate(total=Count('pk')).values('total')
+    )
+
+
+class Command(BaseCommand):
+    help = (
+        'Recalcula Course.lesson_count y los contadores de CourseProgress que no '
+        'coinciden con las lecciones existentes y completadas.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--dry-run', action='store_true', help='Solo informa las diferencias.')
+        parser.add_argument('--batch-size', type=int, default=500)
+
+    def handle(self, *args, **options):
+        completed = (
+            LessonProgress.objects.filter(
+                user=OuterRef('user'), lesson__course=OuterRef('course'), completed=True,
+            )
+            .order_by().values('user').annotate(total=Count('pk')).values('total')
+        )
+        # Contador de lecciones de cada curso
+        counts = Course.objects.annotate(actual=Coalesce(Subquery(lesson_total('pk')), Value(0))).exclude(lesson_count=F('actual'))
+        courses_fixed = 0
+        for course_id, current, actual in counts.values_list('id', 'lesson_count', 'actual'):
+            self.stdout.write(f'course={course_id}: lesson_count {current} -> {actual}')
+            courses_fixed += 1
+            if not options['dry_run']:
+                Course.objects.filter(pk=course_id).update(lesson_count=actual)
+
+        drifted = (
+            CourseProgress.objects.annotate(
+                actual_completed=Coalesce(Subquery(completed), Value(0)),
+                actual_total=Coalesce(Subquery(lesson_total('course')), Value(0)),
+            )
+            .exclude(completed_lessons=F('actual_completed'), total_lessons=F('actual_total'))
+            .order_by('pk')
+        )
+
+        now = timezone.now()
+        fixed = 0
+        batch = []
+        for progress in drifted.iterator(chunk_size=options['batch_size']):
+            self.stdout.write(
+                f'user={progress.user_id} course={progress.course_id}: '
+                f'{progress.completed_lessons}/{progress.total_lessons} -> '
+                f'{progress.actual_completed}/{progress.actual_total}'
+            )
+            progress.completed_lessons = progress.actual_completed
+            progress.total_lessons = progress.actual_total
+            if progress.total_lessons > 0 and progress.completed_lessons >= progress.total_lessons:
+                progress.status = 'completed'
+                progress.completed_at = progress.completed_at or now
+            else:
+                progress.status = 'in_progress'
+                progress.completed_at = None
+            batch.append(progress)
+            fixed += 1
+            if len(batch) >= options['batch_size']:
+                self.save(batch, options['dry_run'])
+                batch = []
+        self.save(batch, options['dry_run'])
+
+        # Lecciones completadas sin fila de CourseProgress
+        missing = (
+            LessonProgress.objects.filter(completed=True)
+            .filter(~Exists(CourseProgress.objects.filter(user=OuterRef('user'), course=OuterRef('lesson__course'))))
+            .order_by().values_list('user_id', 'lesson__course_id')
+            .distinct()
+        )
+        User = get_user_model()
+        created = 0
+        for user_id, course_id in list(missing):
+            created += 1
+            if not options['dry_run']:
+                update_course_progress(User(pk=user_id), Course(pk=course_id))
+
+        verb = 'a corregir' if options['dry_run'] else 'corregidos'
+        self.stdout.write(self.style.SUCCESS(
+            f'{courses_fixed} cursos {verb}, {fixed} progresos {verb}, {created} progresos faltantes.'
+        ))
+
+    def save(self, batch, dry_run):
+        if batch and not dry_run:
+            CourseProgress.objects.bulk_update(
+                batch, ['completed_lessons', 'total_lessons', 'status', 'completed_at']
+            )
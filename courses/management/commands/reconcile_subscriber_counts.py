@@ -0,0 +1,32 @@
+from django.core.management.base import BaseCommand
+from django.db.models import Count, F, OuterRef, Subquery, Value
+from django.db.models.functions import Coalesce
+
+from courses.models import Course, CourseSubscription
+
+
+class Command(BaseCommand):
+    help = 'Recalcula Course.active_subscriber_count a partir de las suscripciones activas.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--dry-run', action='store_true', help='Solo informa las diferencias.')
+
+    def handle(self, *args, **options):
+        active = (
+            CourseSubscription.objects.filter(course=OuterRef('pk'), is_active=True)
+            .order_by().values('course').annotate(total=Count('pk')).values('total')
+        )
+        drifted = (
+            Course.objects.annotate(actual=Coalesce(Subquery(active), Value(0)))
+            .exclude(active_subscriber_count=F('actual'))
+            .order_by('pk')
+        )
+        fixed = 0
+        for course_id, current, actual in drifted.values_list('id', 'active_subscriber_count', 'actual'):
+            self.stdout.write(f'course={course_id}: active_subscriber_count {current} -> {actual}')
+            fixed += 1
+            if not options['dry_run']:
+                Course.objects.filter(pk=course_id).update(active_subscriber_count=actual)
+
+        verb = 'a corregir' if options['dry_run'] else 'corregidos'
+        self.stdout.write(self.style.SUCCESS(f'{fixed} cursos {verb}.'))
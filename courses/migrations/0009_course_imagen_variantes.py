@@ -0,0 +1,18 @@
+# Generated by Django 5.2.7 on 2026-10-18 13:52
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('courses', '0008_alter_course_imagen_portada'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='course',
+            name='imagen_variantes',
+            field=models.JSONField(blank=True, db_column='cover_image_variants', null=True),
+        ),
+    ]
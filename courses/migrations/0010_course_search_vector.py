@@ -0,0 +1,53 @@
+# Generated by Django 5.2.7 on 2026-10-18 13:54
+
+import django.contrib.postgres.search
+from django.db import migrations
+
+
+# El índice GIN y el relleno inicial solo aplican en PostgreSQL; en SQLite
+# la búsqueda recurre a icontains y la columna queda vacía.
+CREATE_INDEX = (
+    'CREATE INDEX IF NOT EXISTS courses_course_search_gin '
+    'ON courses_course USING gin (search_vector)'
+)
+DROP_INDEX = 'DROP INDEX IF EXISTS courses_course_search_gin'
+BACKFILL = """
+UPDATE courses_course c SET search_vector =
+    setweight(to_tsvector('spanish', coalesce(c.title, '')), 'A') ||
+    setweight(to_tsvector('spanish', coalesce(c.short_description, '')), 'B') ||
+    setweight(to_tsvector('spanish', coalesce(c.long_description, '')), 'C') ||
+    setweight(to_tsvector('spanish', coalesce((
+        SELECT string_agg(l.title || ' ' || coalesce(l.content, ''), ' ')
+        FROM lessons_lesson l WHERE l.course_id = c.id
+    ), '')), 'D')
+"""
+
+
+def create_search_index(apps, schema_editor):
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    schema_editor.execute(CREATE_INDEX)
+    schema_editor.execute(BACKFILL)
+
+
+def drop_search_index(apps, schema_editor):
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    schema_editor.execute(DROP_INDEX)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('courses', '0009_course_imagen_variantes'),
+        ('lessons', '0009_lessonupload'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='course',
+            name='search_vector',
+            field=django.contrib.postgres.search.SearchVectorField(editable=False, null=True),
+        ),
+        migrations.RunPython(create_search_index, drop_search_index),
+    ]
@@ -0,0 +1,39 @@
+# Generated by Django 5.2.7 on 2026-10-18 15:02
+
+import secrets
+
+from django.db import migrations
+
+
+CODE_ALPHABET = '23456789ABCDEFGHJKMNPQRSTUVWXYZ'
+CODE_LENGTH = 8
+
+
+def backfill_codes(apps, schema_editor):
+    """Asigna código a los cursos sin él y regenera los duplicados (conserva el más antiguo)."""
+    Course = apps.get_model('courses', 'Course')
+    used = set()
+    pending = []
+    for pk, code in Course.objects.order_by('id').values_list('id', 'codigo'):
+        if code and code not in used:
+            used.add(code)
+        else:
+            pending.append(pk)
+
+    for pk in pending:
+        code = None
+        while code is None or code in used:
+            code = ''.join(secrets.choice(CODE_ALPHABET) for _ in range(CODE_LENGTH))
+        used.add(code)
+        Course.objects.filter(pk=pk).update(codigo=code)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('courses', '0011_course_updated_at'),
+    ]
+
+    operations = [
+        migrations.RunPython(backfill_codes, migrations.RunPython.noop),
+    ]
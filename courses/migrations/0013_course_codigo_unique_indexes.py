@@ -0,0 +1,36 @@
+# Generated by Django 5.2.7 on 2026-10-18 15:02
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('courses', '0012_backfill_course_codigo'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='course',
+            name='codigo',
+            field=models.CharField(blank=True, db_column='code', error_messages={'unique': 'Ya existe un curso con este código.'}, max_length=50, unique=True),
+        ),
+        migrations.AddIndex(
+            model_name='course',
+            index=models.Index(fields=['estado', 'created_at'], name='course_status_created_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='course',
+            index=models.Index(fields=['profesor', 'created_at'], name='course_prof_created_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='course',
+            index=models.Index(fields=['categoria', 'nivel'], name='course_cat_level_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='coursesubscription',
+            index=models.Index(fields=['user', 'is_active'], name='subscription_user_active_idx'),
+        ),
+    ]
@@ -0,0 +1,32 @@
+# Generated by Django 5.2.7 on 2026-10-18 16:20
+
+from django.db import migrations, models
+from django.db.models import Count, OuterRef, Subquery, Value
+from django.db.models.functions import Coalesce
+
+
+def backfill_lesson_count(apps, schema_editor):
+    Course = apps.get_model('courses', 'Course')
+    Lesson = apps.get_model('lessons', 'Lesson')
+    counts = (
+        Lesson.objects.filter(course=OuterRef('pk'))
+        .order_by().values('course').annotate(total=Count('pk')).values('total')
+    )
+    Course.objects.update(lesson_count=Coalesce(Subquery(counts), Value(0)))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('courses', '0013_course_codigo_unique_indexes'),
+        ('lessons', '0010_lesson_updated_at'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='course',
+            name='lesson_count',
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+        migrations.RunPython(backfill_lesson_count, migrations.RunPython.noop),
+    ]
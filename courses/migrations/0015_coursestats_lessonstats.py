@@ -0,0 +1,71 @@
+# Generated by Django 5.2.7 on 2026-10-18 14:09
+
+import django.db.models.deletion
+from django.db import migrations, models
+from django.db.models import Count, OuterRef, Subquery, Value
+from django.db.models.functions import Coalesce
+
+
+def _count(queryset, ref):
+    subquery = queryset.filter(**{ref: OuterRef('pk')}).order_by().values(ref).annotate(total=Count('pk'))
+    return Coalesce(Subquery(subquery.values('total')), Value(0))
+
+
+def backfill_stats(apps, schema_editor):
+    # Los contadores se ajustan después de forma incremental: deben partir de los valores reales
+    Course = apps.get_model('courses', 'Course')
+    CourseProgress = apps.get_model('courses', 'CourseProgress')
+    CourseStats = apps.get_model('courses', 'CourseStats')
+    CourseSubscription = apps.get_model('courses', 'CourseSubscription')
+    Lesson = apps.get_model('lessons', 'Lesson')
+    LessonProgress = apps.get_model('lessons', 'LessonProgress')
+    LessonStats = apps.get_model('courses', 'LessonStats')
+
+    CourseStats.objects.bulk_create(
+        [
+            CourseStats(course_id=pk, active_subscribers=active, completed_count=completed)
+            for pk, active, completed in Course.objects.order_by().annotate(
+                active=_count(CourseSubscription.objects.filter(is_active=True), 'course'),
+                completed=_count(CourseProgress.objects.filter(status='completed'), 'course'),
+            ).values_list('pk', 'active', 'completed')
+        ],
+        batch_size=1000,
+    )
+    LessonStats.objects.bulk_create(
+        [
+            LessonStats(lesson_id=pk, completed_count=completed)
+            for pk, completed in Lesson.objects.order_by().annotate(
+                completed=_count(LessonProgress.objects.filter(completed=True), 'lesson'),
+            ).values_list('pk', 'completed')
+        ],
+        batch_size=1000,
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('courses', '0014_course_lesson_count'),
+        ('lessons', '0010_lesson_updated_at'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='CourseStats',
+            fields=[
+                ('course', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='stats', serialize=False, to='courses.course')),
+                ('active_subscribers', models.PositiveIntegerField(default=0)),
+                ('completed_count', models.PositiveIntegerField(default=0)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+            ],
+        ),
+        migrations.CreateModel(
+            name='LessonStats',
+            fields=[
+                ('lesson', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='stats', serialize=False, to='lessons.lesson')),
+                ('completed_count', models.PositiveIntegerField(default=0)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+            ],
+        ),
+        migrations.RunPython(backfill_stats, migrations.RunPython.noop),
+    ]
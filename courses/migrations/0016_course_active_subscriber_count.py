@@ -0,0 +1,35 @@
+# Generated by Django 5.2.7 on 2026-10-18 17:05
+
+from django.db import migrations, models
+from django.db.models import Count, OuterRef, Subquery, Value
+from django.db.models.functions import Coalesce
+
+
+def backfill_active_subscriber_count(apps, schema_editor):
+    Course = apps.get_model('courses', 'Course')
+    CourseSubscription = apps.get_model('courses', 'CourseSubscription')
+    counts = (
+        CourseSubscription.objects.filter(course=OuterRef('pk'), is_active=True)
+        .order_by().values('course').annotate(total=Count('pk')).values('total')
+    )
+    Course.objects.update(active_subscriber_count=Coalesce(Subquery(counts), Value(0)))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('courses', '0015_coursestats_lessonstats'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='course',
+            name='active_subscriber_count',
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+        migrations.RunPython(backfill_active_subscriber_count, migrations.RunPython.noop),
+        migrations.AddIndex(
+            model_name='course',
+            index=models.Index(fields=['estado', '-active_subscriber_count', '-created_at'], name='course_status_popular_idx'),
+        ),
+    ]
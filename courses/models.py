@@ -1,7 +1,59 @@
+from django.apps import apps
 from django.db import models
 from django.conf import settings
+from django.contrib.postgres.search import SearchVectorField
 from django.core.exceptions import ValidationError
+from django.db.models import F, FilteredRelation, OuterRef, Q, Subquery, Value
+from django.db.models.functions import Coalesce, Greatest
+from django.urls import reverse
 from users.models import User
+from .utils import generate_course_code
+
+
+class CourseQuerySet(models.QuerySet):
+    def for_listing(self):
+        """
+        Precarga lo que necesita CourseListSerializer para que una página del
+        catálogo cueste un número fijo de consultas sin importar su tamaño.
+        """
+        Lesson = apps.get_model('lessons', 'Lesson')
+        # La marca is_subscribed sale de courses.subscriptions, no de la consulta
+        return self.select_related('profesor').prefetch_related(
+            models.Prefetch(
+                'lessons',
+                queryset=Lesson.objects.only('id', 'course', 'created_at').order_by('created_at'),
+                to_attr='listing_lessons',
+            )
+        )
+
+
+class CourseSubscriptionQuerySet(models.QuerySet):
+    def for_overview(self, user):
+        """
+        Suscripciones activas del usuario con su curso, su avance y la fecha de
+        la última lección completada, todo en una sola consulta.
+        """
+        LessonProgress = apps.get_model('lessons', 'LessonProgress')
+        last_completed = (
+            LessonProgress.objects.filter(
+                user=OuterRef('user'), lesson__course=OuterRef('course'), completed_at__isnull=False,
+            )
+            .order_by('-completed_at').values('completed_at')[:1]
+        )
+        return (
+            self.filter(user=user, is_active=True)
+            .select_related('course__profesor')
+            .annotate(
+                user_progress=FilteredRelation('course__progress', condition=Q(course__progress__user=user)),
+                completed_lessons=Coalesce(F('user_progress__completed_lessons'), Value(0)),
+                total_lessons=F('course__lesson_count'),
+                progress_status=Coalesce(F('user_progress__status'), Value('in_progress')),
+                completed_at=F('user_progress__completed_at'),
+                # Sin lecciones completadas (o si se volvió a suscribir después),
+                # cuenta la fecha de la suscripción
+                last_activity_at=Greatest(Coalesce(Subquery(last_completed), F('updated_at')), F('updated_at')),
+            )
+        )
 
 
 class Course(models.Model):
@@ -24,13 +76,22 @@ class Course(models.Model):
 
     # Información general
     titulo = models.CharField(max_length=150, db_column="title")
-    codigo = models.CharField(max_length=50, blank=True, null=True, db_column="code")
+    # Código público de las URLs; si no se indica se genera al guardar
+    codigo = models.CharField(
+        max_length=50,
+        unique=True,
+        blank=True,
+        db_column="code",
+        error_messages={"unique": "Ya existe un curso con este código."},
+    )
     descripcion_corta = models.TextField(max_length=250, db_column="short_description")
     descripcion_detallada = models.TextField(blank=True, null=True, db_column="long_description")
     categoria = models.CharField(max_length=100, db_column="category")
     nivel = models.CharField(max_length=20, choices=NIVEL_CHOICES, db_column="level")
     duracion = models.PositiveIntegerField(blank=True, null=True, db_column="duration_hours")
     imagen_portada = models.TextField(blank=True, null=True, db_column="cover_image_url")
+    # Variantes procesadas de la portada: {"thumbnail": {"width", "height", "webp", "jpg"}, ...}
+    imagen_variantes = models.JSONField(blank=True, null=True, db_column="cover_image_variants")
 
     # Publicación y trazabilidad
     ESTADO_CHOICES = [
@@ -39,6 +100,16 @@ class Course(models.Model):
     ]
     estado = models.CharField(max_length=20, choices=ESTADO_CHOICES, default="publicado", db_column="status")
     created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    # Número de lecciones, mantenido por las señales de courses/signals.py
+    lesson_count = models.PositiveIntegerField(default=0, editable=False)
+    # Suscripciones activas, mantenido por courses.stats.record_subscription_change
+    active_subscriber_count = models.PositiveIntegerField(default=0, editable=False)
+
+    # Búsqueda de texto completo: lo mantienen las señales de courses/signals.py.
+    # El índice GIN se crea en la migración solo cuando el motor es PostgreSQL.
+    search_vector = SearchVectorField(null=True, editable=False)
 
     # Gamificación
     gamificacion = models.BooleanField(default=False, db_column="gamification_enabled")
@@ -50,6 +121,8 @@ class Course(models.Model):
         db_column="gamification_type",
     )
 
+    objects = CourseQuerySet.as_manager()
+
     def clean(self):
         # Si se activa gamificación, exigir tipo de gamificación
         if self.gamificacion and not self.tipo_gamificacion:
@@ -57,11 +130,38 @@ class Course(models.Model):
                 "tipo_gamificacion": "Debe seleccionar un tipo de gamificación cuando está activada."
             })
 
+    def get_cover_url(self, variant='thumbnail', fmt='webp', request=None):
+        """URL de una variante de la portada; si no fue procesada, la URL original."""
+        entry = (self.imagen_variantes or {}).get(variant)
+        if not entry:
+            value = self.imagen_portada or ''
+            return value if value.startswith(('http://', 'https://', '/')) else ''
+        url = reverse('course-cover-image', kwargs={'digest': entry[fmt], 'fmt': fmt})
+        return request.build_absolute_uri(url) if request is not None else url
+
+    def save(self, *args, **kwargs):
+        if not self.codigo:
+            self.codigo = generate_course_code()
+        super().save(*args, **kwargs)
+
     def __str__(self):
         return self.titulo
 
     
     class Meta:
+        indexes = [
+            # Catálogo público: estado='publicado' ordenado por fecha
+            models.Index(fields=['estado', 'created_at'], name='course_status_created_idx'),
+            # Catálogo público ordenado por popularidad (?ordering=popular)
+            models.Index(
+                fields=['estado', '-active_subscriber_count', '-created_at'],
+                name='course_status_popular_idx',
+            ),
+            # Cursos del profesor ordenados por fecha
+            models.Index(fields=['profesor', 'created_at'], name='course_prof_created_idx'),
+            # Filtros y facetas del catálogo
+            models.Index(fields=['categoria', 'nivel'], name='course_cat_level_idx'),
+        ]
         constraints = [
             # Si gamificación está activa, tipo_gamificacion no puede ser NULL
             models.CheckConstraint(
@@ -100,8 +200,37 @@ class CourseSubscription(models.Model):
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
 
+    objects = CourseSubscriptionQuerySet.as_manager()
+
     class Meta:
         unique_together = ('user', 'course')
+        indexes = [
+            models.Index(fields=['user', 'is_active'], name='subscription_user_active_idx'),
+        ]
 
     def __str__(self):
         return f"{self.user} -> {self.course} ({'Activo' if self.is_active else 'Inactivo'})"
+
+
+class CourseStats(models.Model):
+    """
+    Resumen por curso para el panel del profesor. Se ajusta de forma
+    incremental desde courses/stats.py; `rebuild_course_stats` lo recalcula.
+    """
+    course = models.OneToOneField(Course, on_delete=models.CASCADE, primary_key=True, related_name='stats')
+    active_subscribers = models.PositiveIntegerField(default=0)
+    completed_count = models.PositiveIntegerField(default=0)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    def __str__(self):
+        return f"Estadísticas de {self.course_id}"
+
+
+class LessonStats(models.Model):
+    """Estudiantes que completaron cada lección (abandono entre lecciones)."""
+    lesson = models.OneToOneField('lessons.Lesson', on_delete=models.CASCADE, primary_key=True, related_name='stats')
+    completed_count = models.PositiveIntegerField(default=0)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    def __str__(self):
+        return f"Estadísticas de la lección {self.lesson_id}"
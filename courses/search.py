@@ -0,0 +1,70 @@
+from django.apps import apps
+from django.contrib.postgres.aggregates import StringAgg
+from django.contrib.postgres.search import SearchQuery, SearchRank, SearchVector
+from django.db import connections
+from django.db.models import F, OuterRef, Q, Subquery, TextField, Value
+from django.db.models.functions import Coalesce, Concat
+
+
+SEARCH_CONFIG = 'spanish'
+
+
+def supports_full_text(using='default'):
+    return connections[using].vendor == 'postgresql'
+
+
+def _lessons_text():
+    Lesson = apps.get_model('lessons', 'Lesson')
+    text = (
+        Lesson.objects.filter(course=OuterRef('pk'))
+        .order_by()
+        .values('course')
+        .annotate(
+            text=StringAgg(
+                Concat('title', Value(' '), Coalesce('content', Value(''), output_field=TextField()), output_field=TextField()),
+                delimiter=' ',
+            )
+        )
+        .values('text')
+    )
+    return Coalesce(Subquery(text, output_field=TextField()), Value(''), output_field=TextField())
+
+
+def course_search_vector():
+    """Vector ponderado: título > descripción corta > descripción larga > lecciones."""
+    return (
+        SearchVector('titulo', weight='A', config=SEARCH_CONFIG)
+        + SearchVector('descripcion_corta', weight='B', config=SEARCH_CONFIG)
+        + SearchVector(Coalesce('descripcion_detallada', Value(''), output_field=TextField()), weight='C', config=SEARCH_CONFIG)
+        + SearchVector(_lessons_text(), weight='D', config=SEARCH_CONFIG)
+    )
+
+
+def refresh_search_vector(course_ids):
+    """Recalcula Course.search_vector de los cursos indicados (solo PostgreSQL)."""
+    Course = apps.get_model('courses', 'Course')
+    if not course_ids or not supports_full_text(Course.objects.db):
+        return
+    Course.objects.filter(pk__in=course_ids).update(search_vector=course_search_vector())
+
+
+def search_courses(queryset, text):
+    """
+    Filtra y ordena por relevancia. En PostgreSQL usa el tsvector almacenado
+    (índice GIN); en otros motores (SQLite en local) recurre a icontains.
+    """
+    if supports_full_text(queryset.db):
+        query = SearchQuery(text, config=SEARCH_CONFIG, search_type='websearch')
+        return (
+            queryset.filter(search_vector=query)
+            .annotate(rank=SearchRank(F('search_vector'), query))
+            .order_by('-rank', '-created_at', '-id')
+        )
+    matches = (
+        Q(titulo__icontains=text)
+        | Q(descripcion_corta__icontains=text)
+        | Q(descripcion_detallada__icontains=text)
+        | Q(lessons__title__icontains=text)
+        | Q(lessons__content__icontains=text)
+    )
+    return queryset.filter(matches).distinct().order_by('-created_at', '-id')
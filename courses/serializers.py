@@ -1,6 +1,11 @@
 from rest_framework import serializers
+from core.serializers import DynamicFieldsMixin
+from django.core.exceptions import ValidationError as DjangoValidationError
+from django.db.models import FilteredRelation, Q
+from .images import process_inline_cover
 from .models import Course, CourseProgress, CourseSubscription
-from lessons.models import LessonProgress, Lesson
+from .subscriptions import is_subscribed
+from lessons.models import Lesson
 
 
 class CourseSerializer(serializers.ModelSerializer):
@@ -21,6 +26,8 @@ class CourseSerializer(serializers.ModelSerializer):
             'profesor',
         ]
         read_only_fields = ('id', 'profesor')
+        # Sin código (vacío o null) el modelo genera uno al guardar
+        extra_kwargs = {'codigo': {'required': False, 'allow_null': True}}
 
     def validate(self, attrs):
         # Si gamificación está activa, tipo_gamificacion es obligatorio
@@ -30,15 +37,39 @@ class CourseSerializer(serializers.ModelSerializer):
             })
         return attrs
 
+    def _process_cover(self, course):
+        try:
+            process_inline_cover(course)
+        except DjangoValidationError as exc:
+            raise serializers.ValidationError({'imagen_portada': exc.messages})
+
     def create(self, validated_data):
         request = self.context.get('request')
         user = getattr(request, 'user', None)
-        return Course.objects.create(profesor=user, **validated_data)
+        course = Course(profesor=user, **validated_data)
+        self._process_cover(course)
+        course.save()
+        return course
+
+    def update(self, instance, validated_data):
+        for attr, value in validated_data.items():
+            setattr(instance, attr, value)
+        if 'imagen_portada' in validated_data:
+            instance.imagen_variantes = None
+            self._process_cover(instance)
+        instance.save()
+        return instance
+
+    def to_representation(self, instance):
+        data = super().to_representation(instance)
+        if instance.imagen_variantes:
+            data['imagen_portada'] = instance.get_cover_url('hero', request=self.context.get('request'))
+        return data
     
 
 
 
-class CourseListSerializer(serializers.ModelSerializer):
+class CourseListSerializer(DynamicFieldsMixin, serializers.ModelSerializer):
     id = serializers.IntegerField(source='pk')
     public_code = serializers.CharField(source='codigo')
     image = serializers.SerializerMethodField()
@@ -49,6 +80,7 @@ class CourseListSerializer(serializers.ModelSerializer):
     nivel = serializers.SerializerMethodField()
     duration = serializers.SerializerMethodField()
     professor = serializers.SerializerMethodField()
+    subscriber_count = serializers.IntegerField(source='active_subscriber_count', read_only=True)
     is_subscribed = serializers.SerializerMethodField()
     lessons = serializers.SerializerMethodField()
 
@@ -65,18 +97,23 @@ class CourseListSerializer(serializers.ModelSerializer):
             'nivel',
             'duration',
             'professor',
+            'subscriber_count',
             'is_subscribed',
             'lessons',
         )
+        # Columnas que necesitan los campos calculados (para ?fields= / ?omit=)
+        field_sources = {
+            'image': ('imagen_portada', 'imagen_variantes'),
+            'nivel': ('nivel',),
+            'duration': ('duracion',),
+            'professor': ('profesor',),
+        }
+        field_prefetches = {'lessons': ('listing_lessons',)}
+        # La paginación por cursor lee las columnas de orden de cada fila
+        always_columns = ('created_at', 'active_subscriber_count')
 
     def get_is_subscribed(self, obj):
-        request = self.context.get('request')
-        user = getattr(request, 'user', None)
-        if not user or not user.is_authenticated:
-            return False
-        if getattr(user, 'rol', None) == '1':
-            return True
-        return CourseSubscription.objects.filter(user=user, course=obj, is_active=True).exists()
+        return is_subscribed(self.context.get('request'), obj.pk)
 
     def get_nivel(self, obj: Course) -> str:
         try:
@@ -90,7 +127,8 @@ class CourseListSerializer(serializers.ModelSerializer):
         return f"{obj.duracion} horas"
 
     def get_image(self, obj: Course) -> str:
-        return obj.imagen_portada or ""
+        # Solo la variante pequeña: el catálogo nunca envía la imagen completa
+        return obj.get_cover_url('thumbnail', request=self.context.get('request'))
 
     def get_professor(self, obj: Course):
         if obj.profesor:
@@ -102,11 +140,41 @@ class CourseListSerializer(serializers.ModelSerializer):
         return None
 
     def get_lessons(self, obj: Course):
+        prefetched = getattr(obj, 'listing_lessons', None)
+        if prefetched is not None:
+            return [lesson.id for lesson in prefetched]
         return list(
             obj.lessons.all().order_by('created_at').values_list('id', flat=True)
         )
 
 
+class CourseCardSerializer(CourseListSerializer):
+    """Tarjeta de curso sin las partes que requieren consultas extra (lecciones)."""
+
+    class Meta(CourseListSerializer.Meta):
+        fields = (
+            'id',
+            'public_code',
+            'image',
+            'title',
+            'short_description',
+            'category',
+            'nivel',
+            'duration',
+            'professor',
+        )
+
+
+class StudentCourseOverviewSerializer(serializers.Serializer):
+    """Una suscripción anotada con CourseSubscription.objects.for_overview."""
+    course = CourseCardSerializer()
+    completed_lessons = serializers.IntegerField()
+    total_lessons = serializers.IntegerField()
+    status = serializers.CharField(source='progress_status')
+    completed_at = serializers.DateTimeField(allow_null=True)
+    last_activity_at = serializers.DateTimeField()
+
+
 class LessonBriefSerializer(serializers.Serializer):
     title = serializers.CharField()
     duration = serializers.CharField(allow_blank=True, required=False)
@@ -115,7 +183,7 @@ class LessonBriefSerializer(serializers.Serializer):
     locked = serializers.BooleanField()
 
 
-class CourseDetailSerializer(serializers.ModelSerializer):
+class CourseDetailSerializer(DynamicFieldsMixin, serializers.ModelSerializer):
     title = serializers.CharField(source='titulo')
     short_description = serializers.CharField(source='descripcion_corta')
     long_description = serializers.CharField(source='descripcion_detallada', allow_blank=True, allow_null=True)
@@ -141,6 +209,12 @@ class CourseDetailSerializer(serializers.ModelSerializer):
             'lessons',
             'is_subscribed',
         )
+        field_sources = {
+            'nivel': ('nivel',),
+            'duration': ('duracion',),
+            'cover_image': ('imagen_portada', 'imagen_variantes'),
+            'professor': ('profesor',),
+        }
 
     def get_nivel(self, obj: Course) -> str:
         try:
@@ -154,43 +228,39 @@ class CourseDetailSerializer(serializers.ModelSerializer):
         return f"{obj.duracion} horas"
 
     def get_cover_image(self, obj: Course):
-        return obj.imagen_portada or ""
+        return obj.get_cover_url('hero', request=self.context.get('request'))
 
-    def get_lessons(self, obj: Course):
-        return list(obj.lessons.all().order_by('order').values_list('id', flat=True))
-
-    def _user_is_subscribed(self):
-        request = self.context.get('request')
-        user = getattr(request, 'user', None)
-        if not user or not user.is_authenticated:
-            return False
+    def _user_is_subscribed(self, obj: Course):
+        # La vista lo resuelve una vez y lo pasa en el contexto
+        if 'is_subscribed' in self.context:
+            return self.context['is_subscribed']
         # Profesores siempre pueden ver su propio contenido
-        if getattr(user, 'rol', None) == '1':
-            return True
-        # Verificar suscripción específica al curso
-        course = self.instance
-        if course is not None:
-            return CourseSubscription.objects.filter(user=user, course=course, is_active=True).exists()
-        return False
+        return is_subscribed(self.context.get('request'), obj.pk)
 
     def get_is_subscribed(self, obj: Course):
-        return self._user_is_subscribed()
+        return self._user_is_subscribed(obj)
 
     def get_lessons(self, obj: Course):
         request = self.context.get('request')
-        is_subscribed = self._user_is_subscribed()
+        subscribed = self._user_is_subscribed(obj)
+        lessons = obj.lessons.order_by('created_at')
+        if subscribed:
+            lessons = lessons.defer('file').with_file_flag()
+        else:
+            # Lecciones bloqueadas: solo metadatos, sin contenido ni datos del archivo
+            lessons = lessons.only('id', 'course', 'title', 'is_game_linked', 'created_at')
         items = []
-        for lesson in getattr(obj, 'lessons', []).all().order_by('created_at'):
-            resource_url = ''
-            if getattr(lesson, 'file', None) and is_subscribed:
-                resource_url = lesson.file
+        for lesson in lessons:
+            has_resource = subscribed and lesson.has_file
             items.append({
-                'title': getattr(lesson, 'title', ''),
-                'content': (getattr(lesson, 'content', '') or '') if is_subscribed else '',
+                'title': lesson.title,
+                'content': (lesson.content or '') if subscribed else '',
                 'duration': '',
-                'is_game_linked': bool(getattr(lesson, 'is_game_linked', False)),
-                'resource_url': resource_url,
-                'locked': not is_subscribed,
+                'is_game_linked': lesson.is_game_linked,
+                'resource_url': lesson.get_file_url(request) if has_resource else '',
+                'resource_size': lesson.file_size if has_resource else None,
+                'resource_sha256': lesson.file_sha256 if has_resource else None,
+                'locked': not subscribed,
             })
         return items
 
@@ -220,22 +290,45 @@ class CourseProgressSerializer(serializers.ModelSerializer):
         )
 
     def get_lessons(self, obj: CourseProgress):
-        user = obj.user
-        lessons = obj.course.lessons.all().order_by('created_at')
-        progress_map = {
-            lp.lesson_id: lp
-            for lp in LessonProgress.objects.filter(user=user, lesson__course=obj.course)
-        }
-        data = []
-        for lesson in lessons:
-            lp = progress_map.get(lesson.id)
-            data.append({
-                'lesson_id': lesson.id,
-                'title': lesson.title,
-                'completed': lp.completed if lp else False,
-                'completed_at': lp.completed_at if lp else None,
-            })
-        return data
+        # Lecciones y progreso del usuario en una sola consulta (LEFT JOIN filtrado)
+        lessons = (
+            Lesson.objects.filter(course_id=obj.course_id)
+            .annotate(user_progress=FilteredRelation('progress', condition=Q(progress__user=obj.user_id)))
+            .values('id', 'title', 'user_progress__completed', 'user_progress__completed_at')
+            .order_by('created_at')
+        )
+        return [
+            {
+                'lesson_id': lesson['id'],
+                'title': lesson['title'],
+                'completed': bool(lesson['user_progress__completed']),
+                'completed_at': lesson['user_progress__completed_at'],
+            }
+            for lesson in lessons
+        ]
+
+
+class CourseProgressSummarySerializer(CourseProgressSerializer):
+    class Meta(CourseProgressSerializer.Meta):
+        fields = ('course', 'completed_lessons', 'total_lessons', 'status', 'completed_at')
+
+
+class LessonProgressSyncItemSerializer(serializers.Serializer):
+    lesson_id = serializers.IntegerField(min_value=1)
+    completed = serializers.BooleanField(default=True)
+    completed_at = serializers.DateTimeField(required=False, allow_null=True)
+
+
+class LessonProgressSyncSerializer(serializers.Serializer):
+    MAX_ITEMS = 500
+
+    progress = LessonProgressSyncItemSerializer(many=True, allow_empty=False)
+
+    def validate_progress(self, value):
+        if len(value) > self.MAX_ITEMS:
+            raise serializers.ValidationError(f'Se permiten como máximo {self.MAX_ITEMS} lecciones por envío.')
+        # Si una lección aparece varias veces, gana la última entrada
+        return list({item['lesson_id']: item for item in value}.values())
 
 
 class CourseSubscriptionSerializer(serializers.ModelSerializer):
@@ -0,0 +1,78 @@
+from django.db.models import F, Value
+from django.db.models.functions import Greatest
+from django.db.models.signals import post_delete, post_save, pre_save
+from django.dispatch import receiver
+from django.utils import timezone
+
+from .cache import bump_catalog_version, bump_course_version
+from .models import Course
+from .search import refresh_search_vector
+from .utils import refresh_course_progress_for_course
+
+
+SEARCH_FIELDS = {'titulo', 'descripcion_corta', 'descripcion_detallada'}
+
+
+@receiver(post_save, sender=Course)
+def course_saved(sender, instance, update_fields=None, **kwargs):
+    if update_fields is None or SEARCH_FIELDS & set(update_fields):
+        refresh_search_vector([instance.pk])
+    bump_course_version(instance.pk)
+    bump_catalog_version()
+
+
+@receiver(post_delete, sender=Course)
+def course_deleted(sender, instance, **kwargs):
+    bump_course_version(instance.pk)
+    bump_catalog_version()
+
+
+def lesson_changed(course_id, lessons=0):
+    """Actualiza el curso tras cambiar una de sus lecciones; `lessons` es la variación del total."""
+    if not course_id:
+        return
+    refresh_search_vector([course_id])
+    # Mantiene Last-Modified del curso al día también cuando se borra una lección
+    changes = {'updated_at': timezone.now()}
+    if lessons:
+        changes['lesson_count'] = Greatest(F('lesson_count') + lessons, Value(0))
+    Course.objects.filter(pk=course_id).update(**changes)
+    if lessons:
+        # Cambió el total de lecciones: se recalcula el avance de todos los inscritos
+        refresh_course_progress_for_course(course_id)
+    bump_course_version(course_id)
+    # El catálogo muestra los ids de las lecciones de cada curso
+    bump_catalog_version()
+
+
+@receiver(pre_save, sender='lessons.Lesson')
+def lesson_pre_save(sender, instance, **kwargs):
+    # Curso anterior, para mover el contador si la lección cambia de curso
+    instance._previous_course_id = None
+    if not instance._state.adding and instance.pk:
+        instance._previous_course_id = (
+            sender.objects.filter(pk=instance.pk).values_list('course_id', flat=True).first()
+        )
+
+
+@receiver(post_save, sender='lessons.Lesson')
+def lesson_saved(sender, instance, created, **kwargs):
+    previous = getattr(instance, '_previous_course_id', None)
+    if created:
+        lesson_changed(instance.course_id, lessons=1)
+    elif previous != instance.course_id:
+        lesson_changed(previous, lessons=-1)
+        lesson_changed(instance.course_id, lessons=1)
+    else:
+        lesson_changed(instance.course_id)
+
+
+@receiver(post_delete, sender='lessons.Lesson')
+def lesson_deleted(sender, instance, **kwargs):
+    lesson_changed(instance.course_id, lessons=-1)
+
+
+@receiver(post_save, sender='games.MemoryGame')
+@receiver(post_delete, sender='games.MemoryGame')
+def memory_game_changed(sender, instance, **kwargs):
+    bump_course_version(instance.curso_id)
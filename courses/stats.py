@@ -0,0 +1,116 @@
+"""
+Mantenimiento de CourseStats / LessonStats.
+
+Los contadores se ajustan de forma incremental en cada escritura de
+suscripciones y progreso; `refresh_course_stats` y `rebuild_lesson_stats`
+los recalculan con consultas agrupadas (comando rebuild_course_stats).
+"""
+from django.apps import apps
+from django.db import transaction
+from django.db.models import Count, F, OuterRef, Subquery, Value
+from django.db.models.functions import Coalesce, Greatest
+from django.utils import timezone
+
+from .cache import bump_popularity_version
+
+
+def _count(queryset, ref):
+    """Subconsulta COUNT(*) correlacionada por `ref` (sin multiplicar filas con joins)."""
+    subquery = queryset.filter(**{ref: OuterRef('pk')}).order_by().values(ref).annotate(total=Count('pk'))
+    return Coalesce(Subquery(subquery.values('total')), Value(0))
+
+
+def _apply_deltas(model, pks, deltas):
+    """Suma `deltas` ({campo: n}) a las filas `pks`, creándolas si no existen."""
+    changes = {name: Greatest(F(name) + delta, Value(0)) for name, delta in deltas.items() if delta}
+    pks = list(pks)
+    if not changes or not pks:
+        return
+    changes['updated_at'] = timezone.now()
+    pk_name = model._meta.pk.attname
+    queryset = model.objects.filter(pk__in=pks)
+    if queryset.update(**changes) == len(pks):
+        return
+    # Filas que aún no existen: se insertan en cero (sin conflicto si otra
+    # petición las crea a la vez) y se vuelve a aplicar la suma sobre ellas
+    existing = set(queryset.values_list('pk', flat=True))
+    missing = [pk for pk in pks if pk not in existing]
+    model.objects.bulk_create([model(**{pk_name: pk}) for pk in missing], ignore_conflicts=True)
+    model.objects.filter(pk__in=missing).update(**changes)
+
+
+def record_subscription_change(course_id, delta):
+    """Suscripciones activas que se agregan (delta > 0) o se cancelan (delta < 0)."""
+    if not delta:
+        return
+    # Contador del catálogo en el propio curso: incremento atómico con F()
+    apps.get_model('courses', 'Course').objects.filter(pk=course_id).update(
+        active_subscriber_count=Greatest(F('active_subscriber_count') + delta, Value(0)),
+    )
+    _apply_deltas(apps.get_model('courses', 'CourseStats'), [course_id], {'active_subscribers': delta})
+    # Las páginas ordenadas por ese contador dejan de ser válidas; el resto del
+    # catálogo (y las cachés que dependen de su versión) se conserva
+    transaction.on_commit(bump_popularity_version)
+
+
+def record_course_completion(course_id, delta):
+    _apply_deltas(apps.get_model('courses', 'CourseStats'), [course_id], {'completed_count': delta})
+
+
+def record_lesson_completions(deltas):
+    """`deltas` es {lesson_id: +1 | -1}; una actualización por cada valor distinto."""
+    LessonStats = apps.get_model('courses', 'LessonStats')
+    by_delta = {}
+    for lesson_id, delta in deltas.items():
+        if delta:
+            by_delta.setdefault(delta, []).append(lesson_id)
+    for delta, lesson_ids in by_delta.items():
+        _apply_deltas(LessonStats, lesson_ids, {'completed_count': delta})
+
+
+def refresh_course_stats(course_ids=None):
+    """Recalcula CourseStats de los cursos indicados (o de todos) con un único upsert."""
+    Course = apps.get_model('courses', 'Course')
+    CourseProgress = apps.get_model('courses', 'CourseProgress')
+    CourseStats = apps.get_model('courses', 'CourseStats')
+    CourseSubscription = apps.get_model('courses', 'CourseSubscription')
+
+    courses = Course.objects.all() if course_ids is None else Course.objects.filter(pk__in=course_ids)
+    rows = [
+        CourseStats(course_id=row['pk'], active_subscribers=row['active'], completed_count=row['completed'])
+        for row in courses.order_by().values('pk').annotate(
+            active=_count(CourseSubscription.objects.filter(is_active=True), 'course'),
+            completed=_count(CourseProgress.objects.filter(status='completed'), 'course'),
+        )
+    ]
+    CourseStats.objects.bulk_create(
+        rows,
+        batch_size=1000,
+        update_conflicts=True,
+        unique_fields=['course'],
+        update_fields=['active_subscribers', 'completed_count', 'updated_at'],
+    )
+    return len(rows)
+
+
+def rebuild_lesson_stats(course_ids=None):
+    """Recalcula LessonStats de las lecciones de los cursos indicados (o de todas)."""
+    Lesson = apps.get_model('lessons', 'Lesson')
+    LessonProgress = apps.get_model('lessons', 'LessonProgress')
+    LessonStats = apps.get_model('courses', 'LessonStats')
+
+    lessons = Lesson.objects.all() if course_ids is None else Lesson.objects.filter(course_id__in=course_ids)
+    rows = [
+        LessonStats(lesson_id=row['pk'], completed_count=row['completed'])
+        for row in lessons.order_by().values('pk').annotate(
+            completed=_count(LessonProgress.objects.filter(completed=True), 'lesson'),
+        )
+    ]
+    LessonStats.objects.bulk_create(
+        rows,
+        batch_size=1000,
+        update_conflicts=True,
+        unique_fields=['lesson'],
+        update_fields=['completed_count', 'updated_at'],
+    )
+    return len(rows)
@@ -0,0 +1,52 @@
+"""
+Cursos con suscripción activa de cada usuario, para las comprobaciones de
+acceso. Se cargan una vez por petición (se guardan en el objeto request) y
+se cachean entre peticiones durante SUBSCRIPTIONS_TIMEOUT segundos.
+Las escrituras de suscripciones deben llamar a `invalidate_subscriptions`.
+"""
+from django.core.cache import cache
+
+from .models import CourseSubscription
+
+
+SUBSCRIPTIONS_TIMEOUT = 60
+_MEMO_ATTR = '_subscribed_course_ids'
+
+
+def _key(user_id):
+    return f'subscriptions:{user_id}'
+
+
+def get_subscribed_course_ids(request):
+    """frozenset con los ids de los cursos a los que request.user está suscrito."""
+    user = getattr(request, 'user', None)
+    if not user or not user.is_authenticated:
+        return frozenset()
+    memo = getattr(request, _MEMO_ATTR, None)
+    if memo is not None:
+        return memo
+    course_ids = cache.get(_key(user.pk))
+    if course_ids is None:
+        course_ids = frozenset(
+            CourseSubscription.objects.filter(user=user, is_active=True).values_list('course_id', flat=True)
+        )
+        cache.set(_key(user.pk), course_ids, SUBSCRIPTIONS_TIMEOUT)
+    setattr(request, _MEMO_ATTR, course_ids)
+    return course_ids
+
+
+def is_subscribed(request, course_id):
+    """Acceso al contenido del curso: los profesores siempre lo tienen."""
+    user = getattr(request, 'user', None)
+    if not user or not user.is_authenticated:
+        return False
+    if getattr(user, 'rol', None) == '1':
+        return True
+    return course_id in get_subscribed_course_ids(request)
+
+
+def invalidate_subscriptions(*user_ids, request=None):
+    """Descarta los conjuntos cacheados (y el de la petición en curso, si se indica)."""
+    if request is not None and hasattr(request, _MEMO_ATTR):
+        delattr(request, _MEMO_ATTR)
+    cache.delete_many([_key(user_id) for user_id in user_ids])
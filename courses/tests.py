@@ -0,0 +1,329 @@
+import io
+import shutil
+import tempfile
+from unittest import mock, skipUnless
+
+from django.core.cache import cache
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.db import connection, transaction
+from django.db.migrations.executor import MigrationExecutor
+from django.test import TestCase, TransactionTestCase, override_settings
+from django.utils import timezone
+from PIL import Image
+from rest_framework.test import APITestCase
+
+from core.storage import get_blob_storage
+from courses.cache import get_catalog_version
+from courses.enrollment import _insert_subscriptions
+from courses.images import process_cover_image
+from courses.management.commands.check_query_plans import disable_seqscan, explain_indexes, hot_queries
+from courses.models import Course, CourseProgress, CourseStats, CourseSubscription
+from courses.utils import apply_progress_delta
+from lessons.models import Lesson
+from users.models import User
+
+
+class CourseFixturesMixin:
+    def setUp(self):
+        cache.clear()
+        self.prof = User.objects.create_user('prof', 'prof@x.com', 'pw', rol='1')
+        self.stud = User.objects.create_user('stud', 'stud@x.com', 'pw', rol='2')
+
+    def create_courses(self, count, subscribe=True, lessons=2):
+        start = Course.objects.count()
+        courses = []
+        for i in range(start, start + count):
+            course = Course.objects.create(
+                profesor=self.prof, titulo=f'Curso {i}', codigo=f'C{i}',
+                descripcion_corta='d', categoria='cat', nivel='basico',
+            )
+            for j in range(lessons):
+                Lesson.objects.create(course=course, title=f'L{i}-{j}')
+            if subscribe:
+                CourseSubscription.objects.create(user=self.stud, course=course)
+            courses.append(course)
+        return courses
+
+
+class CourseListQueryBudgetTests(CourseFixturesMixin, APITestCase):
+    """Las listas de cursos cuestan un número fijo de consultas, sin importar el tamaño de la página."""
+
+    ENDPOINTS = [
+        # (url, usuario, consultas)
+        ('/api/courses/', None, 3),          # count, página, lecciones
+        ('/api/courses/', 'stud', 4),        # + conjunto de suscripciones
+        ('/api/courses/teacher/', 'prof', 3),
+        ('/api/courses/student/', 'stud', 4),  # suscripciones, count, página, lecciones
+    ]
+
+    def assert_budget(self, count):
+        self.create_courses(count)
+        for url, username, queries in self.ENDPOINTS:
+            with self.subTest(url=url, user=username, courses=count):
+                cache.clear()
+                self.client.force_authenticate(getattr(self, username) if username else None)
+                with self.assertNumQueries(queries):
+                    response = self.client.get(url, {'page_size': 12})
+                self.assertEqual(response.status_code, 200)
+                self.assertEqual(len(response.data['results']), count)
+
+    def test_single_course(self):
+        self.assert_budget(1)
+
+    def test_full_page(self):
+        self.assert_budget(12)
+
+
+class NarrowedFieldsQueryTests(CourseFixturesMixin, APITestCase):
+    """Con ?fields= / ?omit= los campos calculados no cargan columnas diferidas fila a fila."""
+
+    def test_narrowed_catalog_page(self):
+        self.create_courses(10, subscribe=False)
+        for params, queries in (
+            ({'fields': 'title'}, 2),               # count, página
+            ({'fields': 'title,nivel'}, 2),
+            ({'omit': 'professor,lessons'}, 2),
+        ):
+            with self.subTest(**params):
+                cache.clear()
+                with self.assertNumQueries(queries):
+                    response = self.client.get('/api/courses/', params)
+                self.assertEqual(len(response.data['results']), 10)
+
+    def test_narrowed_detail(self):
+        course = self.create_courses(1, subscribe=False)[0]
+        with self.assertNumQueries(3):             # código -> id, versión, curso
+            response = self.client.get(f'/api/courses/{course.codigo}/', {'fields': 'title,nivel'})
+        self.assertEqual(set(response.data), {'title', 'nivel'})
+
+
+class CoverImageTests(CourseFixturesMixin, APITestCase):
+    def setUp(self):
+        super().setUp()
+        root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, root, ignore_errors=True)
+        settings = override_settings(BLOB_STORAGES={
+            'covers': {'BACKEND': 'core.storage.LocalBlobStorage', 'OPTIONS': {'location': root}},
+        })
+        settings.enable()
+        self.addCleanup(settings.disable)
+        get_blob_storage.cache_clear()
+        self.addCleanup(get_blob_storage.cache_clear)
+
+        buffer = io.BytesIO()
+        Image.new('RGB', (400, 200), (200, 30, 30)).save(buffer, 'PNG')
+        self.course = self.create_courses(1, subscribe=False, lessons=0)[0]
+        Course.objects.filter(pk=self.course.pk).update(imagen_variantes=process_cover_image(buffer.getvalue()))
+        self.thumbnail = Course.objects.get(pk=self.course.pk).imagen_variantes['thumbnail']
+
+    def test_variant_is_served_only_in_its_format(self):
+        for fmt, content_type in (('webp', 'image/webp'), ('jpg', 'image/jpeg')):
+            with self.subTest(fmt=fmt):
+                response = self.client.get(f'/api/courses/images/{self.thumbnail[fmt]}.{fmt}')
+                self.assertEqual(response.status_code, 200)
+                self.assertEqual(response['Content-Type'], content_type)
+        response = self.client.get(f'/api/courses/images/{self.thumbnail["webp"]}.jpg')
+        self.assertEqual(response.status_code, 404)
+
+
+class CatalogCacheHeadersTests(CourseFixturesMixin, APITestCase):
+    def test_catalog_varies_on_credentials(self):
+        self.create_courses(1)
+        anonymous = self.client.get('/api/courses/')
+        self.assertIn('public', anonymous['Cache-Control'])
+        self.client.force_authenticate(self.stud)
+        authenticated = self.client.get('/api/courses/')
+        self.assertIn('private', authenticated['Cache-Control'])
+        for response in (anonymous, authenticated):
+            vary = {value.strip() for value in response['Vary'].split(',')}
+            self.assertTrue({'Authorization', 'Cookie'} <= vary)
+
+
+class PopularCatalogTests(CourseFixturesMixin, APITestCase):
+    def catalog_ids(self, ordering):
+        response = self.client.get('/api/courses/', {'ordering': ordering})
+        return response['X-Cache'], [course['id'] for course in response.data['results']]
+
+    def test_subscribing_refreshes_only_popular_ordering(self):
+        older, newer = self.create_courses(2, subscribe=False)
+        for ordering in ('popular', 'recent'):
+            self.assertEqual(self.catalog_ids(ordering), ('MISS', [newer.pk, older.pk]))
+            self.assertEqual(self.catalog_ids(ordering), ('HIT', [newer.pk, older.pk]))
+        catalog_version = get_catalog_version()
+
+        self.client.force_authenticate(self.stud)
+        with self.captureOnCommitCallbacks(execute=True):
+            self.client.post(f'/api/courses/{older.codigo}/subscribe/')
+        self.client.force_authenticate(None)
+        self.assertEqual(self.catalog_ids('popular'), ('MISS', [older.pk, newer.pk]))
+        # El resto del catálogo sigue en caché (subscriber_count atrasado hasta su TTL)
+        self.assertEqual(self.catalog_ids('recent'), ('HIT', [newer.pk, older.pk]))
+        self.assertEqual(get_catalog_version(), catalog_version)
+
+    def test_cursor_pagination_rejects_popular(self):
+        response = self.client.get('/api/courses/', {'ordering': 'popular', 'pagination': 'cursor'})
+        self.assertEqual(response.status_code, 400)
+        response = self.client.get('/api/courses/', {'ordering': 'recent', 'pagination': 'cursor'})
+        self.assertEqual(response.status_code, 200)
+
+
+class SubscriptionCounterTests(CourseFixturesMixin, APITestCase):
+    def setUp(self):
+        super().setUp()
+        self.course = self.create_courses(1, subscribe=False)[0]
+        self.client.force_authenticate(self.stud)
+        self.url = f'/api/courses/{self.course.codigo}/subscribe/'
+
+    def subscriber_count(self):
+        self.course.refresh_from_db()
+        return self.course.active_subscriber_count
+
+    def test_repeated_requests_count_once(self):
+        for method, expected in (('post', 1), ('post', 1), ('delete', 0), ('delete', 0), ('post', 1)):
+            getattr(self.client, method)(self.url)
+            self.assertEqual(self.subscriber_count(), expected)
+
+    def test_stale_reactivation_does_not_count_twice(self):
+        # Otra petición reactivó la suscripción después de que esta la leyera
+        subscription = CourseSubscription.objects.create(user=self.stud, course=self.course, is_active=False)
+        CourseSubscription.objects.filter(pk=subscription.pk).update(is_active=True)
+        with mock.patch.object(CourseSubscription.objects, 'get_or_create', return_value=(subscription, False)):
+            response = self.client.post(self.url)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(self.subscriber_count(), 0)
+
+
+@skipUnless(connection.vendor == 'postgresql', 'EXPLAIN de los índices solo en PostgreSQL')
+class QueryPlanTests(TestCase):
+    """Las consultas más frecuentes usan sus índices (ver el comando check_query_plans)."""
+
+    def test_hot_queries_use_their_indexes(self):
+        with transaction.atomic(), connection.cursor() as cursor:
+            disable_seqscan(cursor)
+            for label, queryset, columns in hot_queries():
+                with self.subTest(label):
+                    used, expected = explain_indexes(cursor, queryset, columns)
+                    self.assertTrue(expected, f'No existe un índice sobre {columns}')
+                    self.assertTrue(used & expected, f'{label}: usa {sorted(used) or "recorrido secuencial"}')
+
+
+class ProgressDeltaTests(CourseFixturesMixin, TestCase):
+    def test_decrement_without_progress_row_does_not_record_completion(self):
+        course = self.create_courses(1, lessons=1)[0]
+        CourseStats.objects.update_or_create(course=course, defaults={'completed_count': 1})
+
+        apply_progress_delta(self.stud.pk, course.pk, -1)
+
+        progress = CourseProgress.objects.get(user=self.stud, course=course)
+        self.assertEqual((progress.completed_lessons, progress.status), (0, 'in_progress'))
+        self.assertEqual(CourseStats.objects.get(course=course).completed_count, 1)
+
+    def test_toggle_without_completion_is_two_statements(self):
+        course = self.create_courses(1, lessons=2)[0]
+        for delta in (1, -1):
+            with self.subTest(delta=delta), self.assertNumQueries(4):  # savepoint, fila bloqueada, escritura, release
+                apply_progress_delta(self.stud.pk, course.pk, delta)
+        progress = CourseProgress.objects.get(user=self.stud, course=course)
+        self.assertEqual((progress.completed_lessons, progress.total_lessons), (0, 2))
+
+    def test_completion_transitions_are_recorded_once(self):
+        course = self.create_courses(1, lessons=1)[0]
+
+        apply_progress_delta(self.stud.pk, course.pk, 1)
+        self.assertEqual(CourseStats.objects.get(course=course).completed_count, 1)
+        apply_progress_delta(self.stud.pk, course.pk, -1)
+        self.assertEqual(CourseStats.objects.get(course=course).completed_count, 0)
+        apply_progress_delta(self.stud.pk, course.pk, -1)
+        self.assertEqual(CourseStats.objects.get(course=course).completed_count, 0)
+
+
+class BulkEnrollTests(CourseFixturesMixin, APITestCase):
+    def setUp(self):
+        super().setUp()
+        self.course = self.create_courses(1, subscribe=False, lessons=0)[0]
+        self.students = [
+            User.objects.create_user(f's{i}', f's{i}@x.com', 'pw', rol='2') for i in range(3)
+        ]
+
+    def test_report_and_subscriber_count(self):
+        CourseSubscription.objects.create(user=self.students[0], course=self.course)
+        CourseSubscription.objects.create(user=self.students[1], course=self.course, is_active=False)
+        self.client.force_authenticate(self.prof)
+        response = self.client.post(
+            f'/api/courses/{self.course.codigo}/enroll/bulk/',
+            {'emails': ['s0@x.com', 'S1@x.com', 's2@x.com', 'prof@x.com', 'nadie@x.com', 's2@x.com']},
+            format='json',
+        )
+        report = b''.join(response.streaming_content).decode().splitlines()
+        self.assertEqual([line.rsplit(',', 1)[1] for line in report[1:]], [
+            'already_enrolled', 'reactivated', 'enrolled', 'not_student', 'not_found', 'duplicate',
+        ])
+        # Las suscripciones de arriba no pasan por los contadores: solo suman
+        # la reactivación y la inscripción nueva
+        self.assertEqual(CourseStats.objects.get(course=self.course).active_subscribers, 2)
+
+    def test_non_utf8_csv_is_rejected(self):
+        self.client.force_authenticate(self.prof)
+        url = f'/api/courses/{self.course.codigo}/enroll/bulk/'
+        body = 'email\ns0@x.com\nJosé@x.com\n'.encode('latin-1')
+        for kwargs in (
+            {'data': body, 'content_type': 'text/csv'},
+            {'data': {'file': SimpleUploadedFile('alumnos.csv', body, 'text/csv')}, 'format': 'multipart'},
+        ):
+            with self.subTest(content_type=kwargs.get('content_type', 'multipart')):
+                response = self.client.post(url, **kwargs)
+                self.assertEqual(response.status_code, 400)
+                self.assertIn('UTF-8', response.data['detail'])
+        self.assertFalse(CourseSubscription.objects.filter(course=self.course).exists())
+
+    def test_insert_returns_only_new_rows(self):
+        # Simula una inscripción concurrente hecha después de leer las existentes
+        CourseSubscription.objects.create(user=self.students[0], course=self.course)
+        inserted = _insert_subscriptions(
+            self.course.pk, [student.pk for student in self.students], timezone.now(),
+        )
+        self.assertEqual(inserted, {self.students[1].pk, self.students[2].pk})
+        self.assertEqual(CourseSubscription.objects.filter(course=self.course).count(), 3)
+
+
+class StatsBackfillMigrationTests(TransactionTestCase):
+    migrate_from = ('courses', '0014_course_lesson_count')
+    migrate_to = ('courses', '0015_coursestats_lessonstats')
+
+    def targets(self, node):
+        # Las demás apps quedan en su última migración
+        leaves = MigrationExecutor(connection).loader.graph.leaf_nodes()
+        return [leaf for leaf in leaves if leaf[0] != node[0]] + [node]
+
+    def migrate(self, targets):
+        executor = MigrationExecutor(connection)
+        executor.migrate(targets)
+        executor.loader.build_graph()
+        return executor.loader.project_state(targets).apps
+
+    def tearDown(self):
+        # Deja la base en el último estado para los demás tests
+        self.migrate(MigrationExecutor(connection).loader.graph.leaf_nodes())
+
+    def test_stats_are_backfilled(self):
+        old_apps = self.migrate(self.targets(self.migrate_from))
+        User = old_apps.get_model('users', 'User')
+        Course = old_apps.get_model('courses', 'Course')
+        Lesson = old_apps.get_model('lessons', 'Lesson')
+        prof = User.objects.create(username='prof', email='prof@x.com', rol='1')
+        stud = User.objects.create(username='stud', email='stud@x.com', rol='2')
+        course = Course.objects.create(
+            profesor=prof, titulo='Curso', codigo='C1', descripcion_corta='d', categoria='cat', nivel='basico',
+        )
+        lesson = Lesson.objects.create(course=course, title='L')
+        old_apps.get_model('courses', 'CourseSubscription').objects.create(user=stud, course=course)
+        old_apps.get_model('courses', 'CourseProgress').objects.create(
+            user=stud, course=course, completed_lessons=1, total_lessons=1, status='completed',
+        )
+        old_apps.get_model('lessons', 'LessonProgress').objects.create(user=stud, lesson=lesson, completed=True)
+
+        new_apps = self.migrate(self.targets(self.migrate_to))
+        stats = new_apps.get_model('courses', 'CourseStats').objects.get(course_id=course.pk)
+        self.assertEqual((stats.active_subscribers, stats.completed_count), (1, 1))
+        lesson_stats = new_apps.get_model('courses', 'LessonStats').objects.get(lesson_id=lesson.pk)
+        self.assertEqual(lesson_stats.completed_count, 1)
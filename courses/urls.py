@@ -3,19 +3,35 @@ from .views import (
     CourseListCreateView,
     CourseDetailView,
     MyCoursesListView,
+    TeacherCourseStatsView,
     LessonProgressUpdateView,
+    LessonProgressSyncView,
     CourseProgressDetailView,
     CourseSubscriptionView,
-    MyCoursesStudentListView
+    CourseBulkEnrollView,
+    MyCoursesStudentListView,
+    StudentCourseOverviewView,
+    CourseCoverImageView,
+    CourseSearchView,
+    CourseFacetsView,
+    CourseCacheStatsView,
 )
 
 
 urlpatterns = [
     path('', CourseListCreateView.as_view(), name='courses-list-create'), #probado
     path('teacher/', MyCoursesListView.as_view(), name='my-courses'), #probado
+    path('teacher/stats/', TeacherCourseStatsView.as_view(), name='teacher-course-stats'),
     path('student/', MyCoursesStudentListView.as_view(), name='courses'), #probado
+    path('student/overview/', StudentCourseOverviewView.as_view(), name='student-course-overview'),
     path('progress/courses/<str:public_code>/', CourseProgressDetailView.as_view(), name='course-progress-detail'), #probado
     path('progress/lessons/<int:lesson_id>/', LessonProgressUpdateView.as_view(), name='lesson-progress-update'), #probado
+    path('progress/sync/', LessonProgressSyncView.as_view(), name='lesson-progress-sync'),
+    path('search/', CourseSearchView.as_view(), name='courses-search'),
+    path('facets/', CourseFacetsView.as_view(), name='courses-facets'),
+    path('cache-stats/', CourseCacheStatsView.as_view(), name='courses-cache-stats'),
+    path('images/<str:digest>.<str:fmt>', CourseCoverImageView.as_view(), name='course-cover-image'),
+    path('<str:public_code>/enroll/bulk/', CourseBulkEnrollView.as_view(), name='course-bulk-enroll'),
     path('<str:public_code>/subscribe/', CourseSubscriptionView.as_view(), name='course-subscription'),
     path('<str:public_code>/', CourseDetailView.as_view(), name='course-detail'), #probado
 ]
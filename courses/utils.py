@@ -1,21 +1,61 @@
+import secrets
+
 from django.apps import apps
+from django.db import connection, transaction
+from django.db.models import Count
 from django.utils import timezone
 
+from .stats import record_course_completion, record_lesson_completions, refresh_course_stats
 
-def update_course_progress(user, course):
+
+# Sin caracteres ambiguos (0/O, 1/I/L): el código se dicta y se copia a mano
+CODE_ALPHABET = '23456789ABCDEFGHJKMNPQRSTUVWXYZ'
+CODE_LENGTH = 8
+
+
+def generate_course_code(length=CODE_LENGTH):
     """
-    Recalcula el avance del usuario en el curso según las lecciones completadas.
-    Retorna la instancia CourseProgress actualizada.
+    Código público corto y aleatorio (31^8 combinaciones). Se comprueba que no
+    exista; el índice único sobre `codigo` cubre la carrera entre procesos.
     """
+    Course = apps.get_model('courses', 'Course')
+    while True:
+        code = ''.join(secrets.choice(CODE_ALPHABET) for _ in range(length))
+        if not Course.objects.filter(codigo=code).exists():
+            return code
+
+
+def compute_course_progress(user, course):
+    """Avance del usuario en el curso calculado sin escribir (instancia sin guardar)."""
     LessonProgress = apps.get_model('lessons', 'LessonProgress')
     CourseProgress = apps.get_model('courses', 'CourseProgress')
 
-    total = course.lessons.count()
+    total = course.lesson_count
     completed = LessonProgress.objects.filter(
         user=user,
         lesson__course=course,
         completed=True,
     ).count()
+    done = total > 0 and completed >= total
+    return CourseProgress(
+        user=user,
+        course=course,
+        total_lessons=total,
+        completed_lessons=completed,
+        status='completed' if done else 'in_progress',
+    )
+
+
+def update_course_progress(user, course):
+    """
+    Recalcula el avance del usuario en el curso según las lecciones completadas.
+    Retorna la instancia CourseProgress actualizada.
+    """
+    CourseProgress = apps.get_model('courses', 'CourseProgress')
+
+    computed = compute_course_progress(user, course)
+    total = computed.total_lessons
+    completed = computed.completed_lessons
 
     course_progress, _ = CourseProgress.objects.get_or_create(
         user=user,
@@ -35,3 +75,208 @@ def update_course_progress(user, course):
 
     course_progress.save()
     return course_progress
+
+
+def refresh_course_progress(user, course_ids):
+    """
+    Recalcula el CourseProgress del usuario en varios cursos a la vez: dos
+    lecturas agrupadas, una de las filas previas y un único upsert.
+    Retorna las instancias calculadas.
+    """
+    Course = apps.get_model('courses', 'Course')
+    LessonProgress = apps.get_model('lessons', 'LessonProgress')
+    CourseProgress = apps.get_model('courses', 'CourseProgress')
+
+    course_ids = set(course_ids)
+    if not course_ids:
+        return []
+    totals = dict(Course.objects.filter(id__in=course_ids).values_list('id', 'lesson_count'))
+    completed = dict(
+        LessonProgress.objects.filter(user=user, completed=True, lesson__course_id__in=course_ids)
+        .order_by().values('lesson__course_id').annotate(total=Count('id'))
+        .values_list('lesson__course_id', 'total')
+    )
+    # Se conserva la fecha en que el curso se completó por primera vez
+    previous = {
+        course_id: (status, completed_at)
+        for course_id, status, completed_at in CourseProgress.objects.filter(
+            user=user, course_id__in=course_ids,
+        ).values_list('course_id', 'status', 'completed_at')
+    }
+
+    now = timezone.now()
+    rows = []
+    completions = {}
+    for course_id in sorted(course_ids):
+        total = totals.get(course_id, 0)
+        done = completed.get(course_id, 0)
+        finished = total > 0 and done >= total
+        previous_status, previous_completed_at = previous.get(course_id, ('in_progress', None))
+        rows.append(CourseProgress(
+            user=user,
+            course_id=course_id,
+            total_lessons=total,
+            completed_lessons=done,
+            status='completed' if finished else 'in_progress',
+            completed_at=(previous_completed_at or now) if finished else None,
+        ))
+        was_finished = previous_status == 'completed'
+        if was_finished != finished:
+            completions[course_id] = -1 if was_finished else 1
+    CourseProgress.objects.bulk_create(
+        rows,
+        update_conflicts=True,
+        unique_fields=['user', 'course'],
+        update_fields=['total_lessons', 'completed_lessons', 'status', 'completed_at'],
+    )
+    for course_id, delta in completions.items():
+        record_course_completion(course_id, delta)
+    return rows
+
+
+# Primer avance del usuario en el curso: la fila se crea ya con `done`
+# lecciones. total_lessons se toma de Course.lesson_count. El WHERE 1 = 1 es
+# necesario en SQLite: sin él, el ON CONFLICT de un INSERT ... SELECT se
+# interpreta como parte del JOIN del SELECT.
+_PROGRESS_INSERT = """
+INSERT INTO {table} (user_id, course_id, completed_lessons, total_lessons, status, completed_at)
+SELECT %(user)s, %(course)s, c.done, c.total,
+       CASE WHEN c.total > 0 AND c.done >= c.total THEN 'completed' ELSE 'in_progress' END,
+       CASE WHEN c.total > 0 AND c.done >= c.total THEN %(now)s END
+FROM (
+    SELECT %(done)s AS done, lesson_count AS total FROM {courses} WHERE id = %(course)s
+) c
+WHERE 1 = 1
+ON CONFLICT (user_id, course_id) DO NOTHING
+RETURNING status
+"""
+
+# Suma `delta` a completed_lessons en la propia base de datos (equivale a
+# F('completed_lessons') + delta, sin leer el valor)
+_PROGRESS_UPDATE = """
+UPDATE {table} SET
+    completed_lessons = {new},
+    total_lessons = c.lesson_count,
+    status = CASE WHEN c.lesson_count > 0 AND {new} >= c.lesson_count THEN 'completed' ELSE 'in_progress' END,
+    completed_at = CASE WHEN c.lesson_count > 0 AND {new} >= c.lesson_count
+                        THEN COALESCE({table}.completed_at, %(now)s) END
+FROM {courses} c
+WHERE c.id = {table}.course_id AND {table}.user_id = %(user)s AND {table}.course_id = %(course)s
+RETURNING {table}.status
+"""
+
+
+def apply_progress_delta(user_id, course_id, delta):
+    """
+    Ajusta completed_lessons del usuario en el curso: un INSERT si aún no hay
+    fila, o la fila bloqueada y un UPDATE. El estado anterior se lee de la
+    fila bloqueada para registrar cada finalización una sola vez.
+    """
+    CourseProgress = apps.get_model('courses', 'CourseProgress')
+    Course = apps.get_model('courses', 'Course')
+    table = CourseProgress._meta.db_table
+    courses = Course._meta.db_table
+    current = f'{table}.completed_lessons + %(delta)s'
+    params = {
+        'user': user_id,
+        'course': course_id,
+        'delta': delta,
+        'done': max(delta, 0),
+        'now': timezone.now(),
+    }
+    lookup = CourseProgress.objects.select_for_update().filter(user_id=user_id, course_id=course_id)
+    with transaction.atomic(), connection.cursor() as cursor:
+        previous = lookup.values_list('status', flat=True).first()
+        if previous is None:
+            cursor.execute(_PROGRESS_INSERT.format(table=table, courses=courses), params)
+            row = cursor.fetchone()
+            if row is not None:
+                if row[0] == 'completed':
+                    record_course_completion(course_id, 1)
+                return
+            # Otra petición creó la fila a la vez: se bloquea y se actualiza
+            previous = lookup.values_list('status', flat=True).get()
+
+        cursor.execute(
+            _PROGRESS_UPDATE.format(
+                table=table, courses=courses, new=f'CASE WHEN {current} > 0 THEN {current} ELSE 0 END',
+            ),
+            params,
+        )
+        (status,) = cursor.fetchone()
+        was_finished = previous == 'completed'
+        if was_finished != (status == 'completed'):
+            record_course_completion(course_id, -1 if was_finished else 1)
+
+
+def set_lesson_completed(user, lesson, completed):
+    """
+    Marca o desmarca una lección para el usuario. Si el estado no cambia no
+    escribe nada; si cambia, ajusta CourseProgress de forma incremental.
+    Retorna (lesson_progress, changed).
+    """
+    LessonProgress = apps.get_model('lessons', 'LessonProgress')
+    lookup = LessonProgress.objects.select_for_update().filter(user=user, lesson=lesson)
+
+    with transaction.atomic():
+        progress = lookup.first()
+        if progress is None:
+            if not completed:
+                return LessonProgress(user=user, lesson=lesson, completed=False), False
+            # Otra petición pudo crear la fila a la vez: se inserta sin conflicto y se bloquea
+            LessonProgress.objects.bulk_create(
+                [LessonProgress(user=user, lesson=lesson, completed=False)], ignore_conflicts=True
+            )
+            progress = lookup.get()
+        if progress.completed == completed:
+            return progress, False
+
+        progress.completed = completed
+        progress.save(update_fields=['completed', 'completed_at'])
+        delta = 1 if completed else -1
+        apply_progress_delta(user.pk, lesson.course_id, delta)
+        record_lesson_completions({lesson.pk: delta})
+    return progress, True
+
+
+# Recalcula el avance de todos los inscritos de un curso en una sola sentencia
+_COURSE_PROGRESS_REFRESH = """
+UPDATE {table} SET
+    total_lessons = s.total,
+    completed_lessons = s.done,
+    status = CASE WHEN s.total > 0 AND s.done >= s.total THEN 'completed' ELSE 'in_progress' END,
+    completed_at = CASE WHEN s.total > 0 AND s.done >= s.total
+                        THEN COALESCE({table}.completed_at, %(now)s) END
+FROM (
+    SELECT p.id, c.lesson_count AS total, COUNT(lp.id) AS done
+    FROM {table} p
+    JOIN {courses} c ON c.id = p.course_id
+    LEFT JOIN {progress} lp ON lp.user_id = p.user_id AND lp.completed
+        AND lp.lesson_id IN (SELECT id FROM {lessons} WHERE course_id = %(course)s)
+    WHERE p.course_id = %(course)s
+    GROUP BY p.id, c.lesson_count
+) s
+WHERE {table}.id = s.id
+"""
+
+
+def refresh_course_progress_for_course(course_id):
+    """
+    Tras agregar o borrar lecciones, actualiza total_lessons, completed_lessons,
+    status y completed_at de todos los CourseProgress del curso con un
+    UPDATE ... FROM sobre una subconsulta agregada.
+    """
+    Course = apps.get_model('courses', 'Course')
+    CourseProgress = apps.get_model('courses', 'CourseProgress')
+    Lesson = apps.get_model('lessons', 'Lesson')
+    LessonProgress = apps.get_model('lessons', 'LessonProgress')
+    sql = _COURSE_PROGRESS_REFRESH.format(
+        table=CourseProgress._meta.db_table,
+        courses=Course._meta.db_table,
+        progress=LessonProgress._meta.db_table,
+        lessons=Lesson._meta.db_table,
+    )
+    with connection.cursor() as cursor:
+        cursor.execute(sql, {'course': course_id, 'now': timezone.now()})
+    # Los estados de muchos inscritos pueden haber cambiado a la vez
+    refresh_course_stats([course_id])
@@ -1,21 +1,55 @@
 from rest_framework import generics, status
-from rest_framework.permissions import IsAuthenticated, AllowAny
+from rest_framework.permissions import IsAuthenticated, AllowAny, IsAdminUser
 from rest_framework.response import Response
-from rest_framework.pagination import PageNumberPagination
+from rest_framework.pagination import CursorPagination, PageNumberPagination
+from rest_framework.parsers import FormParser, JSONParser, MultiPartParser
 from rest_framework.views import APIView
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models import Count, FilteredRelation, Max, Q
+from django.core.exceptions import ValidationError as DjangoValidationError
+from django.http import Http404, StreamingHttpResponse
 from django.shortcuts import get_object_or_404
-
-from .models import Course, CourseSubscription
+from django.utils import timezone
+from django.utils.cache import patch_vary_headers
+
+from core.pagination import EstimatedCountPaginator
+from core.responses import add_validators, make_etag, not_modified, serve_blob
+from core.serializers import fieldset_key
+from core.storage import get_blob_storage, is_valid_digest
+from .cache import (
+    RESPONSE_TIMEOUT,
+    get_cache_stats,
+    get_catalog_version,
+    get_course_version,
+    get_or_build,
+    get_popularity_version,
+    make_key,
+)
+from .enrollment import MAX_ROWS as MAX_ENROLL_ROWS, CSVTextParser, enroll_emails, parse_emails, report_lines
+from .images import COVER_FORMATS, COVER_VARIANTS
+from .search import search_courses
+from .stats import record_lesson_completions, record_subscription_change
+from .subscriptions import get_subscribed_course_ids, invalidate_subscriptions, is_subscribed
+from .models import Course, CourseProgress, CourseSubscription
 from lessons.models import Lesson, LessonProgress
 from .serializers import (
     CourseSerializer,
     CourseListSerializer,
     CourseDetailSerializer,
     CourseProgressSerializer,
+    CourseProgressSummarySerializer,
     CourseSubscriptionSerializer,
+    LessonProgressSyncSerializer,
+    StudentCourseOverviewSerializer,
 )
 from .permissions import IsProfessor, IsStudent
-from .utils import update_course_progress
+from .utils import compute_course_progress, refresh_course_progress, set_lesson_completed
+
+
+# Respuestas anónimas: el CDN puede servirlas durante s-maxage sin llegar a Django
+PUBLIC_CACHE_CONTROL = 'public, max-age=60, s-maxage=300'
+PRIVATE_CACHE_CONTROL = 'private, max-age=0'
 
 
 class CoursesPagination(PageNumberPagination):
@@ -24,31 +58,88 @@ class CoursesPagination(PageNumberPagination):
     max_page_size = 100
 
 
-class CourseListCreateView(generics.ListCreateAPIView):
+class CoursesEstimatedPagination(CoursesPagination):
+    """Paginación por número de página con conteo estimado (?count=estimated)."""
+    django_paginator_class = EstimatedCountPaginator
+
+    def get_paginated_response(self, data):
+        response = super().get_paginated_response(data)
+        response.data['count_is_estimate'] = True
+        return response
+
+
+class CoursesCursorPagination(CursorPagination):
+    """Paginación por cursor (keyset) sobre (created_at, id) (?pagination=cursor)."""
+    page_size = 12
+    page_size_query_param = 'page_size'
+    max_page_size = 100
+    ordering = ('-created_at', '-id')
+
+    def get_ordering(self, request, queryset, view):
+        # El catálogo puede ordenarse por otras columnas (?ordering=popular)
+        if hasattr(view, 'get_list_ordering'):
+            return view.get_list_ordering()
+        return self.ordering
+
+
+class CoursePaginationMixin:
+    """Permite a los listados de cursos elegir el modo de paginación por query param."""
+    pagination_class = CoursesPagination
+
+    @property
+    def paginator(self):
+        if not hasattr(self, '_paginator'):
+            params = self.request.query_params
+            if params.get('pagination') == 'cursor':
+                self._paginator = CoursesCursorPagination()
+            elif params.get('count') == 'estimated':
+                self._paginator = CoursesEstimatedPagination()
+            else:
+                self._paginator = self.pagination_class()
+        return self._paginator
+
+
+def normalize_level(level):
+    level_norm = level.strip().lower()
+    # Acepta 'basico' / 'básico' o etiquetas
+    mapping = {
+        'básico': 'basico',
+        'basico': 'basico',
+        'intermedio': 'intermedio',
+        'avanzado': 'avanzado',
+    }
+    return mapping.get(level_norm, level_norm)
+
+
+# Órdenes del catálogo público (?ordering=); cada uno termina en id para ser estable
+CATALOG_ORDERINGS = {
+    'recent': ('-created_at', '-id'),
+    'popular': ('-active_subscriber_count', '-created_at', '-id'),
+}
+
+
+def filter_catalog(qs, params):
+    """Filtros opcionales del catálogo público (?category=, ?level=)."""
+    category = params.get('category')
+    level = params.get('level')
+    if category:
+        qs = qs.filter(categoria__iexact=category)
+    if level:
+        qs = qs.filter(nivel=normalize_level(level))
+    return qs
+
+
+class CourseListCreateView(CoursePaginationMixin, generics.ListCreateAPIView):
     queryset = Course.objects.all()
     serializer_class = CourseSerializer
     permission_classes = [IsAuthenticated, IsProfessor]
-    pagination_class = CoursesPagination
 
     def get_queryset(self):
         # GET: listar cursos publicados con filtros opcionales
         if self.request.method == 'GET':
-            qs = Course.objects.filter(estado='publicado').order_by('-created_at')
-            category = self.request.query_params.get('category')
-            level = self.request.query_params.get('level')
-            if category:
-                qs = qs.filter(categoria__iexact=category)
-            if level:
-                level_norm = level.strip().lower()
-                # Acepta 'basico' / 'básico' o etiquetas
-                mapping = {
-                    'básico': 'basico',
-                    'basico': 'basico',
-                    'intermedio': 'intermedio',
-                    'avanzado': 'avanzado',
-                }
-                qs = qs.filter(nivel=mapping.get(level_norm, level_norm))
-            return qs
+            qs = Course.objects.filter(estado='publicado').for_listing().order_by(*self.get_list_ordering())
+            qs = filter_catalog(qs, self.request.query_params)
+            return CourseListSerializer.narrow_queryset(qs, self.request)
 
         # POST: cursos del profesor autenticado
         user = self.request.user
@@ -66,6 +157,9 @@ class CourseListCreateView(generics.ListCreateAPIView):
             return CourseListSerializer
         return CourseSerializer
 
+    def get_list_ordering(self):
+        return CATALOG_ORDERINGS.get(self.request.query_params.get('ordering') or 'recent')
+
     def list(self, request, *args, **kwargs):
         # Validación simple de parámetros de paginación
         for param in ("page", "page_size"):
@@ -79,39 +173,242 @@ class CourseListCreateView(generics.ListCreateAPIView):
                     return Response({
                         'detail': f'Parámetro inválido: {param} debe ser un entero positivo.'
                     }, status=status.HTTP_400_BAD_REQUEST)
-
+        if self.get_list_ordering() is None:
+            return Response({
+                'detail': f"Parámetro inválido: ordering debe ser uno de: {', '.join(CATALOG_ORDERINGS)}."
+            }, status=status.HTTP_400_BAD_REQUEST)
+        if request.query_params.get('pagination') == 'cursor' and request.query_params.get('ordering') == 'popular':
+            # El cursor se posiciona sobre active_subscriber_count, que cambia
+            # entre páginas: se saltarían o repetirían cursos
+            return Response({
+                'detail': 'Parámetro inválido: pagination=cursor no admite ordering=popular; use page.'
+            }, status=status.HTTP_400_BAD_REQUEST)
+
+        # La página pública se cachea por versión del catálogo; la marca
+        # is_subscribed de cada usuario se aplica después con una sola consulta.
+        # El orden por popularidad cambia con cada suscripción: esas páginas
+        # llevan además su propia versión
+        popular = self.get_list_ordering() == CATALOG_ORDERINGS['popular']
+        key = make_key(
+            'catalog-page',
+            get_catalog_version(),
+            get_popularity_version() if popular else None,
+            request.get_host(),
+            sorted(request.query_params.lists()),
+        )
+        cached, hit = get_or_build('catalog', key, self.build_public_page)
+        response = Response(self.personalize(cached, request.user))
+        response['X-Cache'] = 'HIT' if hit else 'MISS'
+        response['Cache-Control'] = PRIVATE_CACHE_CONTROL if request.user.is_authenticated else PUBLIC_CACHE_CONTROL
+        # La página anónima no lleva is_subscribed: un CDN no debe servirla a usuarios autenticados
+        patch_vary_headers(response, ('Authorization', 'Cookie'))
+        return response
+
+    def build_public_page(self):
         queryset = self.get_queryset()
         page = self.paginate_queryset(queryset)
         if page is not None:
             serializer = self.get_serializer(page, many=True)
-            return self.get_paginated_response(serializer.data)
-
-        serializer = self.get_serializer(queryset, many=True)
-        return Response(serializer.data)
-
-
-class MyCoursesListView(generics.ListAPIView):
+            data = dict(self.get_paginated_response(serializer.data).data)
+        else:
+            page = list(queryset)
+            data = {'results': self.get_serializer(page, many=True).data}
+        if 'is_subscribed' in self.get_serializer().fields:
+            data['results'] = [{**item, 'is_subscribed': False} for item in data['results']]
+        # Los ids se guardan aparte: ?fields= puede haber excluido 'id'
+        return {'data': data, 'ids': [course.pk for course in page]}
+
+    def personalize(self, cached, user):
+        data = cached['data']
+        if not user or not user.is_authenticated or 'is_subscribed' not in self.get_serializer().fields:
+            return data
+        course_ids = cached['ids']
+        if getattr(user, 'rol', None) == '1':
+            subscribed = set(course_ids)
+        else:
+            subscribed = get_subscribed_course_ids(self.request)
+        results = [
+            {**item, 'is_subscribed': course_id in subscribed}
+            for item, course_id in zip(data['results'], course_ids)
+        ]
+        return {**data, 'results': results}
+
+
+class MyCoursesListView(CoursePaginationMixin, generics.ListAPIView):
     """Lista únicamente los cursos del profesor autenticado."""
     serializer_class = CourseListSerializer
     permission_classes = [IsAuthenticated, IsProfessor]
-    pagination_class = CoursesPagination
 
     def get_queryset(self):
         user = self.request.user
-        return Course.objects.filter(profesor=user).order_by('-created_at')
+        qs = Course.objects.filter(profesor=user).for_listing().order_by('-created_at')
+        return CourseListSerializer.narrow_queryset(qs, self.request)
+
+def _rate(part, total):
+    return round(min(part / total, 1.0), 4) if total else 0.0
+
 
-class MyCoursesStudentListView(generics.ListAPIView):
+class TeacherCourseStatsView(APIView):
+    """
+    Panel del profesor: suscriptores activos, finalización y abandono por
+    lección. Lee los resúmenes de CourseStats/LessonStats, así el costo depende
+    del número de cursos y lecciones, no del de estudiantes.
+    """
+    permission_classes = [IsAuthenticated, IsProfessor]
+
+    def get(self, request):
+        courses = (
+            Course.objects.filter(profesor=request.user)
+            .order_by('-created_at')
+            .values('id', 'codigo', 'titulo', 'lesson_count', 'stats__active_subscribers', 'stats__completed_count')
+        )
+        lessons = {}
+        for lesson in (
+            Lesson.objects.filter(course__profesor=request.user)
+            .order_by('course_id', 'created_at')
+            .values('id', 'course_id', 'title', 'stats__completed_count')
+        ):
+            lessons.setdefault(lesson['course_id'], []).append(lesson)
+
+        data = []
+        for course in courses:
+            subscribers = course['stats__active_subscribers'] or 0
+            completed = course['stats__completed_count'] or 0
+            previous = subscribers
+            lesson_items = []
+            for lesson in lessons.get(course['id'], []):
+                lesson_completed = lesson['stats__completed_count'] or 0
+                lesson_items.append({
+                    'id': lesson['id'],
+                    'title': lesson['title'],
+                    'completed_count': lesson_completed,
+                    'completion_rate': _rate(lesson_completed, subscribers),
+                    # Estudiantes que completaron la lección anterior pero no esta
+                    'drop_off': max(previous - lesson_completed, 0),
+                })
+                previous = lesson_completed
+            data.append({
+                'id': course['id'],
+                'public_code': course['codigo'],
+                'title': course['titulo'],
+                'lesson_count': course['lesson_count'],
+                'active_subscribers': subscribers,
+                'completed_count': completed,
+                'completion_rate': _rate(completed, subscribers),
+                'lessons': lesson_items,
+            })
+        return Response({'results': data}, status=status.HTTP_200_OK)
+
+
+class MyCoursesStudentListView(CoursePaginationMixin, generics.ListAPIView):
     """Lista únicamente los cursos del estudiante autenticado."""
     serializer_class = CourseListSerializer
     permission_classes = [IsAuthenticated, IsStudent]
+
+    def get_queryset(self):
+        course_ids = get_subscribed_course_ids(self.request)
+        qs = Course.objects.filter(pk__in=course_ids).for_listing().order_by('-created_at')
+        return CourseListSerializer.narrow_queryset(qs, self.request)
+
+
+class StudentOverviewPagination(CursorPagination):
+    """Cursor (keyset) sobre la última actividad: los cursos en uso primero."""
+    page_size = 20
+    page_size_query_param = 'page_size'
+    max_page_size = 100
+    ordering = ('-last_activity_at', '-id')
+
+
+class StudentCourseOverviewView(generics.ListAPIView):
+    """
+    Inicio del estudiante: cada suscripción activa con la tarjeta del curso y
+    su avance. Solo lectura y una consulta por página.
+    """
+    serializer_class = StudentCourseOverviewSerializer
+    permission_classes = [IsAuthenticated, IsStudent]
+    pagination_class = StudentOverviewPagination
+
+    def get_queryset(self):
+        return CourseSubscription.objects.for_overview(self.request.user)
+
+
+class CourseSearchView(generics.ListAPIView):
+    """Búsqueda por relevancia en cursos publicados y en sus lecciones (?q=)."""
+    serializer_class = CourseListSerializer
+    permission_classes = [AllowAny]
     pagination_class = CoursesPagination
 
+    def list(self, request, *args, **kwargs):
+        if len(request.query_params.get('q', '').strip()) < 2:
+            return Response(
+                {'detail': 'Parámetro inválido: q debe tener al menos 2 caracteres.'},
+                status=status.HTTP_400_BAD_REQUEST,
+            )
+        return super().list(request, *args, **kwargs)
+
     def get_queryset(self):
-        user = self.request.user
-        return Course.objects.filter(
-            subscriptions__user=user,
-            subscriptions__is_active=True,
-        ).order_by('-created_at').distinct()
+        params = self.request.query_params
+        qs = Course.objects.filter(estado='publicado').for_listing()
+        qs = filter_catalog(qs, params)
+        qs = search_courses(qs, params.get('q', '').strip())
+        return CourseListSerializer.narrow_queryset(qs, self.request)
+
+
+class CourseFacetsView(APIView):
+    """
+    Conteos por categoría y por nivel para la barra de filtros del catálogo.
+    Cada faceta respeta los demás filtros activos pero no el suyo propio, así
+    el usuario ve a cuántos cursos llevaría cambiar de categoría o de nivel.
+    """
+    permission_classes = [AllowAny]
+    cache_timeout = 300
+
+    def get(self, request):
+        params = request.query_params
+        category = (params.get('category') or '').strip()
+        level = normalize_level(params.get('level') or '')
+        text = (params.get('q') or '').strip()
+
+        key = make_key('facets', get_catalog_version(), category.lower(), level, text.lower())
+        data = cache.get(key)
+        if data is None:
+            data = self.compute(category, level, text)
+            cache.set(key, data, self.cache_timeout)
+        return Response(data, status=status.HTTP_200_OK)
+
+    def compute(self, category, level, text):
+        qs = Course.objects.filter(estado='publicado')
+        if text:
+            qs = qs.filter(pk__in=search_courses(qs, text).values('pk'))
+        # Una sola consulta agrupada por (categoría, nivel); ambas facetas se derivan de ella
+        rows = list(qs.order_by().values('categoria', 'nivel').annotate(total=Count('id')))
+
+        categories = {}
+        levels = {}
+        total = 0
+        for row in rows:
+            in_category = not category or row['categoria'].lower() == category.lower()
+            in_level = not level or row['nivel'] == level
+            if in_level:
+                categories[row['categoria']] = categories.get(row['categoria'], 0) + row['total']
+            if in_category:
+                levels[row['nivel']] = levels.get(row['nivel'], 0) + row['total']
+            if in_category and in_level:
+                total += row['total']
+
+        level_labels = dict(Course.NIVEL_CHOICES)
+        return {
+            'total': total,
+            'categories': [
+                {'value': value, 'count': count}
+                for value, count in sorted(categories.items(), key=lambda item: (-item[1], item[0]))
+            ],
+            'levels': [
+                {'value': value, 'label': level_labels.get(value, value), 'count': levels[value]}
+                for value, _ in Course.NIVEL_CHOICES
+                if value in levels
+            ],
+        }
 
 
 class CourseDetailView(generics.RetrieveAPIView):
@@ -120,7 +417,63 @@ class CourseDetailView(generics.RetrieveAPIView):
 
     def get_object(self):
         public_code = self.kwargs.get('public_code')
-        return get_object_or_404(Course, codigo=public_code, estado='publicado')
+        queryset = CourseDetailSerializer.narrow_queryset(Course.objects.select_related('profesor'), self.request)
+        return get_object_or_404(queryset, codigo=public_code, estado='publicado')
+
+    def get_serializer_context(self):
+        context = super().get_serializer_context()
+        if hasattr(self, 'subscribed'):
+            context['is_subscribed'] = self.subscribed
+        return context
+
+    def get_course_id(self):
+        # Código público -> id, cacheado por versión del catálogo (0 = no existe)
+        public_code = self.kwargs.get('public_code')
+        key = make_key('code', get_catalog_version(), public_code)
+        course_id = cache.get(key)
+        if course_id is None:
+            course_id = (
+                Course.objects.filter(codigo=public_code, estado='publicado')
+                .values_list('id', flat=True)
+                .first()
+            ) or 0
+            cache.set(key, course_id, RESPONSE_TIMEOUT)
+        if not course_id:
+            raise Http404
+        return course_id
+
+    def get_version(self, course_id):
+        # Datos de versión en una sola consulta, sin cargar ni serializar lecciones
+        return Course.objects.filter(pk=course_id).aggregate(
+            updated_at=Max('updated_at'),
+            lesson_count=Count('lessons'),
+            lessons_updated_at=Max('lessons__updated_at'),
+        )
+
+    def retrieve(self, request, *args, **kwargs):
+        course_id = self.get_course_id()
+        user = request.user
+        self.subscribed = subscribed = is_subscribed(request, course_id)
+        # Anónimos y no suscritos comparten la versión pública (lecciones bloqueadas)
+        variant = 'subscribed' if subscribed else 'public'
+
+        version = self.get_version(course_id)
+        last_modified = max(filter(None, (version['updated_at'], version['lessons_updated_at'])))
+        etag = make_etag(
+            'course', course_id, variant, fieldset_key(request),
+            version['updated_at'], version['lesson_count'], version['lessons_updated_at'],
+        )
+        cache_control = PRIVATE_CACHE_CONTROL if user.is_authenticated else PUBLIC_CACHE_CONTROL
+
+        response = not_modified(request, etag, last_modified)
+        if response is None:
+            key = make_key(
+                'detail', course_id, get_course_version(course_id), variant, request.get_host(), fieldset_key(request),
+            )
+            data, hit = get_or_build('detail', key, lambda: self.get_serializer(self.get_object()).data)
+            response = Response(data)
+            response['X-Cache'] = 'HIT' if hit else 'MISS'
+        return add_validators(response, etag, last_modified, cache_control)
 
     def create(self, request, *args, **kwargs):
         serializer = self.get_serializer(data=request.data)
@@ -148,17 +501,20 @@ class LessonProgressUpdateView(APIView):
                 status=status.HTTP_403_FORBIDDEN,
             )
 
-        lesson = get_object_or_404(Lesson, pk=lesson_id)
+        lesson = get_object_or_404(Lesson.objects.only('id', 'course_id'), pk=lesson_id)
         completed = request.data.get('completed', True)
         if isinstance(completed, str):
             completed = completed.lower() in ['1', 'true', 'yes']
         completed = bool(completed)
 
-        progress, _ = LessonProgress.objects.get_or_create(user=user, lesson=lesson)
-        progress.completed = completed
-        progress.save()
+        progress, _ = set_lesson_completed(user, lesson, completed)
 
-        course_progress = update_course_progress(user, lesson.course)
+        course_progress = (
+            CourseProgress.objects.select_related('course').filter(user=user, course_id=lesson.course_id).first()
+        )
+        if course_progress is None:
+            # Desmarcar una lección nunca completada no escribe nada
+            course_progress = compute_course_progress(user, lesson.course)
         serializer = CourseProgressSerializer(course_progress, context={'request': request})
 
         return Response(
@@ -175,6 +531,87 @@ class LessonProgressUpdateView(APIView):
         )
 
 
+class LessonProgressSyncView(APIView):
+    """
+    Sincroniza en un solo envío el progreso de varias lecciones, de uno o
+    varios cursos (clientes que vuelven a estar en línea o envían por lotes).
+    """
+    permission_classes = [IsAuthenticated]
+
+    def post(self, request):
+        user = request.user
+        if getattr(user, 'rol', None) != '2':
+            return Response(
+                {'detail': 'Solo los estudiantes pueden actualizar su progreso.'},
+                status=status.HTTP_403_FORBIDDEN,
+            )
+
+        data = {'progress': request.data} if isinstance(request.data, list) else request.data
+        serializer = LessonProgressSyncSerializer(data=data)
+        serializer.is_valid(raise_exception=True)
+        items = serializer.validated_data['progress']
+
+        # Lección, suscripción activa y progreso actual del usuario en una sola consulta
+        lessons = {
+            row['id']: row
+            for row in Lesson.objects.filter(id__in=[item['lesson_id'] for item in items])
+            .annotate(user_progress=FilteredRelation('progress', condition=Q(progress__user=user)))
+            .values('id', 'course_id', 'user_progress__completed')
+        }
+        subscribed = get_subscribed_course_ids(request)
+
+        now = timezone.now()
+        rows = []
+        rejected = []
+        course_ids = set()
+        for item in items:
+            lesson = lessons.get(item['lesson_id'])
+            if lesson is None:
+                rejected.append({'lesson_id': item['lesson_id'], 'detail': 'La lección no existe.'})
+                continue
+            if lesson['course_id'] not in subscribed:
+                rejected.append({
+                    'lesson_id': item['lesson_id'],
+                    'detail': 'No tienes una suscripción activa a este curso.',
+                })
+                continue
+            completed = item['completed']
+            if bool(lesson['user_progress__completed']) == completed:
+                continue  # Sin cambios: no se escribe nada
+            completed_at = None
+            if completed:
+                # La fecha del cliente se respeta, pero nunca en el futuro
+                completed_at = min(item.get('completed_at') or now, now)
+            rows.append(LessonProgress(
+                user=user, lesson_id=lesson['id'], completed=completed, completed_at=completed_at,
+            ))
+            course_ids.add(lesson['course_id'])
+
+        with transaction.atomic():
+            LessonProgress.objects.bulk_create(
+                rows,
+                update_conflicts=True,
+                unique_fields=['user', 'lesson'],
+                update_fields=['completed', 'completed_at'],
+            )
+            record_lesson_completions({row.lesson_id: 1 if row.completed else -1 for row in rows})
+            # Un solo recálculo por curso afectado
+            summaries = refresh_course_progress(user, course_ids)
+
+        courses = Course.objects.only('id', 'codigo').in_bulk(course_ids)
+        for summary in summaries:
+            summary.course = courses[summary.course_id]
+        return Response(
+            {
+                'message': 'Progreso sincronizado',
+                'updated': len(rows),
+                'rejected': rejected,
+                'courses': CourseProgressSummarySerializer(summaries, many=True).data,
+            },
+            status=status.HTTP_200_OK,
+        )
+
+
 class CourseProgressDetailView(APIView):
     permission_classes = [IsAuthenticated]
 
@@ -186,8 +623,14 @@ class CourseProgressDetailView(APIView):
                 status=status.HTTP_403_FORBIDDEN,
             )
 
-        course = get_object_or_404(Course, codigo=public_code, estado='publicado')
-        course_progress = update_course_progress(user, course)
+        course = get_object_or_404(
+            Course.objects.only('id', 'codigo', 'lesson_count'), codigo=public_code, estado='publicado'
+        )
+        # Solo lectura: el progreso se mantiene al marcar lecciones, no al consultarlo
+        course_progress = CourseProgress.objects.filter(user=user, course=course).first()
+        if course_progress is None:
+            course_progress = compute_course_progress(user, course)
+        course_progress.course = course
         serializer = CourseProgressSerializer(course_progress, context={'request': request})
         return Response(serializer.data, status=status.HTTP_200_OK)
 
@@ -203,10 +646,20 @@ class CourseSubscriptionView(APIView):
                 status=status.HTTP_403_FORBIDDEN,
             )
         course = get_object_or_404(Course, codigo=public_code, estado='publicado')
-        subscription, created = CourseSubscription.objects.get_or_create(user=user, course=course)
-        if not created and not subscription.is_active:
-            subscription.is_active = True
-            subscription.save()
+        with transaction.atomic():
+            subscription, created = CourseSubscription.objects.get_or_create(user=user, course=course)
+            if created:
+                record_subscription_change(course.pk, 1)
+            elif not subscription.is_active:
+                # UPDATE condicional: si llegan dos peticiones a la vez, solo una
+                # cambia la fila y suma al contador
+                subscription.is_active = True
+                subscription.updated_at = timezone.now()
+                if CourseSubscription.objects.filter(pk=subscription.pk, is_active=False).update(
+                    is_active=True, updated_at=subscription.updated_at,
+                ):
+                    record_subscription_change(course.pk, 1)
+        invalidate_subscriptions(user.pk, request=request)
         serializer = CourseSubscriptionSerializer(subscription, context={'request': request})
         return Response(
             {'message': 'Suscripción activada', 'subscription': serializer.data},
@@ -221,10 +674,81 @@ class CourseSubscriptionView(APIView):
                 status=status.HTTP_403_FORBIDDEN,
             )
         course = get_object_or_404(Course, codigo=public_code, estado='publicado')
-        try:
-            subscription = CourseSubscription.objects.get(user=user, course=course)
-            subscription.is_active = False
-            subscription.save()
-            return Response({'message': 'Suscripción cancelada'}, status=status.HTTP_200_OK)
-        except CourseSubscription.DoesNotExist:
+        subscriptions = CourseSubscription.objects.filter(user=user, course=course)
+        if not subscriptions.exists():
             return Response({'detail': 'No existe una suscripción activa.'}, status=status.HTTP_404_NOT_FOUND)
+        with transaction.atomic():
+            # Mismo UPDATE condicional que en post: solo una cancelación resta
+            cancelled = subscriptions.filter(is_active=True).update(is_active=False, updated_at=timezone.now())
+            if cancelled:
+                record_subscription_change(course.pk, -1)
+        if cancelled:
+            invalidate_subscriptions(user.pk, request=request)
+        return Response({'message': 'Suscripción cancelada'}, status=status.HTTP_200_OK)
+
+
+class CourseBulkEnrollView(APIView):
+    """
+    Inscripción masiva de estudiantes por correo (lista JSON o CSV). El reporte
+    por fila se envía en streaming como CSV a medida que se procesa cada lote.
+    """
+    permission_classes = [IsAuthenticated, IsProfessor]
+    parser_classes = [JSONParser, CSVTextParser, MultiPartParser, FormParser]
+
+    def post(self, request, public_code):
+        course = get_object_or_404(Course.objects.only('id', 'profesor_id'), codigo=public_code)
+        if course.profesor_id != request.user.id:
+            return Response(
+                {'detail': 'No tienes permiso para inscribir estudiantes en este curso.'},
+                status=status.HTTP_403_FORBIDDEN,
+            )
+        try:
+            emails = parse_emails(request.data)
+        except DjangoValidationError as exc:
+            return Response({'detail': exc.messages[0]}, status=status.HTTP_400_BAD_REQUEST)
+        if not emails:
+            return Response({'detail': 'La lista de correos está vacía.'}, status=status.HTTP_400_BAD_REQUEST)
+        if len(emails) > MAX_ENROLL_ROWS:
+            return Response(
+                {'detail': f'Se permiten como máximo {MAX_ENROLL_ROWS} correos por envío.'},
+                status=status.HTTP_400_BAD_REQUEST,
+            )
+
+        response = StreamingHttpResponse(
+            report_lines(enroll_emails(course, emails)), content_type='text/csv; charset=utf-8'
+        )
+        response['Content-Disposition'] = f'attachment; filename="inscripciones-{public_code}.csv"'
+        return response
+
+
+class CourseCoverImageView(APIView):
+    """Variantes de portada direccionadas por contenido: se pueden cachear para siempre."""
+    permission_classes = [AllowAny]
+    authentication_classes = []
+
+    def get(self, request, digest, fmt):
+        storage = get_blob_storage('covers')
+        if fmt not in COVER_FORMATS or not is_valid_digest(digest) or not storage.exists(digest):
+            raise Http404
+        # El blob debe ser una variante de portada en ese formato: si no, se
+        # serviría (y se cachearía para siempre) con un Content-Type equivocado
+        variant = Q()
+        for name, _ in COVER_VARIANTS:
+            variant |= Q(**{f'imagen_variantes__{name}__{fmt}': digest})
+        if not Course.objects.filter(variant).exists():
+            raise Http404
+        return serve_blob(
+            request,
+            storage,
+            digest,
+            content_type=COVER_FORMATS[fmt][1],
+            cache_control='public, max-age=31536000, immutable',
+        )
+
+
+class CourseCacheStatsView(APIView):
+    """Aciertos y fallos de la caché de respuestas del catálogo (solo staff)."""
+    permission_classes = [IsAdminUser]
+
+    def get(self, request):
+        return Response(get_cache_stats(), status=status.HTTP_200_OK)
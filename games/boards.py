@@ -0,0 +1,97 @@
+"""
+Tableros del juego de memoria generados en el servidor. Para una misma
+semilla todos los dispositivos reciben el mismo tablero; se memoizan por
+(juego, versión, semilla) en un LRU de cada proceso, así una clase que
+comparte semilla cuesta un solo cálculo por worker.
+"""
+import functools
+import random
+import re
+import secrets
+
+from django.core.exceptions import ValidationError
+
+from .models import MemoryGamePair
+
+
+MAX_SIDE = 10
+MAX_SEED_LENGTH = 64
+BOARD_CACHE_SIZE = 512
+
+_GRID_RE = re.compile(r'^\s*(\d+)\s*[x×*]\s*(\d+)\s*$', re.IGNORECASE)
+_SEED_RE = re.compile(r'^[\w-]+$')
+
+
+def parse_grid_size(value):
+    """'4x4', '3 x 4', '4×5'... -> (filas, columnas); el total de cartas debe ser par."""
+    match = _GRID_RE.match(value or '')
+    if not match:
+        raise ValidationError(f"grid_size inválido: '{value}'. Use el formato FILASxCOLUMNAS, por ejemplo 4x4.")
+    rows, cols = int(match.group(1)), int(match.group(2))
+    if not (1 <= rows <= MAX_SIDE and 1 <= cols <= MAX_SIDE):
+        raise ValidationError(f'grid_size inválido: cada lado debe estar entre 1 y {MAX_SIDE}.')
+    if (rows * cols) % 2:
+        raise ValidationError('grid_size inválido: el número de cartas debe ser par.')
+    return rows, cols
+
+
+def clean_seed(value):
+    """Semilla del query param; si no se envía se genera una para poder compartirla."""
+    if value in (None, ''):
+        return secrets.token_hex(4)
+    if len(value) > MAX_SEED_LENGTH or not _SEED_RE.match(value):
+        raise ValidationError(f'seed inválida: use hasta {MAX_SEED_LENGTH} letras, números, _ o -.')
+    return value
+
+
+def build_board(game_id, grid_size, version, seed):
+    """
+    Tablero listo para la respuesta. Cada llamada devuelve un dict nuevo, así
+    que quien lo reciba puede modificarlo sin afectar a otras peticiones.
+    """
+    rows, cols, pairs, layout = _cached_board(game_id, grid_size, version, seed)
+    return {
+        'game': game_id,
+        'seed': seed,
+        'rows': rows,
+        'cols': cols,
+        'pairs': [
+            {'id': pair_id, 'question_text': question, 'answer_text': answer}
+            for pair_id, question, answer in pairs
+        ],
+        'layout': [[list(card) for card in row] for row in layout],
+    }
+
+
+@functools.lru_cache(maxsize=BOARD_CACHE_SIZE)
+def _cached_board(game_id, grid_size, version, seed):
+    """
+    Elige y baraja los pares del tablero; devuelve solo tuplas para que el
+    resultado compartido no pueda modificarse. El LRU es propio de cada
+    proceso: entre workers sirve porque `version` forma parte de la clave y
+    cambia al editar el juego, así nadie usa una entrada anterior.
+    """
+    rows, cols = parse_grid_size(grid_size)
+    needed = rows * cols // 2
+    pairs = list(
+        MemoryGamePair.objects.filter(juego_id=game_id)
+        .order_by('id')
+        .values_list('id', 'question_text', 'answer_text')
+    )
+    if len(pairs) < needed:
+        raise ValidationError(
+            f'El juego tiene {len(pairs)} pares y el tablero {grid_size} necesita {needed}.'
+        )
+
+    rng = random.Random(f'{game_id}:{seed}')
+    selected = sorted(rng.sample(pairs, needed))
+    # Cada carta es (índice del par, lado): 0 = pregunta, 1 = respuesta
+    cards = [(index, side) for index in range(needed) for side in (0, 1)]
+    rng.shuffle(cards)
+    return (
+        rows,
+        cols,
+        # Sin pregunta, las dos cartas muestran la respuesta
+        tuple((pair_id, question or answer, answer) for pair_id, question, answer in selected),
+        tuple(tuple(cards[row * cols:(row + 1) * cols]) for row in range(rows)),
+    )
@@ -0,0 +1,121 @@
+"""
+Resultados del juego de memoria y ranking por juego.
+
+Cada usuario tiene a lo sumo un resultado con is_best=True por juego; el
+ranking es un RANK() sobre esas filas (índice parcial gameresult_ranking_idx).
+Los rankings se cachean por versión del juego y la versión cambia solo
+cuando alguien mejora su mejor resultado.
+"""
+from django.contrib.auth import get_user_model
+from django.db import transaction
+from django.db.models import Count, F, OuterRef, Q, Subquery, Value, Window
+from django.db.models.functions import Coalesce, Rank
+
+from courses.cache import bump_leaderboard_version, get_leaderboard_version, get_or_build, make_key
+from .models import GameResult
+
+
+MAX_LIMIT = 100
+DEFAULT_LIMIT = 10
+MAX_RESULTS_PER_BATCH = 100
+
+
+def _sort_key(score, duration):
+    # Mayor puntaje primero; a igual puntaje, menor duración
+    return (score, -duration)
+
+
+def record_results(game, user, items):
+    """
+    Guarda un lote de resultados del usuario y actualiza su mejor resultado.
+    Devuelve (resultados creados, mejor resultado, si es un nuevo mejor).
+    """
+    results = [GameResult(juego=game, user=user, **item) for item in items]
+    candidate = max(results, key=lambda result: _sort_key(result.score, result.duration))
+    with transaction.atomic():
+        # Bloquea al usuario para que dos lotes simultáneos no marquen dos mejores
+        get_user_model().objects.select_for_update().only('pk').get(pk=user.pk)
+        best = GameResult.objects.filter(juego=game, user=user, is_best=True).first()
+        improved = best is None or _sort_key(candidate.score, candidate.duration) > _sort_key(best.score, best.duration)
+        if improved:
+            if best is not None:
+                GameResult.objects.filter(pk=best.pk).update(is_best=False)
+            candidate.is_best = True
+            best = candidate
+        GameResult.objects.bulk_create(results)
+        if improved:
+            transaction.on_commit(lambda: bump_leaderboard_version(game.pk))
+    return results, best, improved
+
+
+def _ranked_rows(game_id, limit=None, user_id=None):
+    """Una sola consulta: las primeras `limit` posiciones y/o la fila de `user_id`."""
+    best = GameResult.objects.filter(juego_id=game_id, is_best=True)
+    if limit is None:
+        # Filtrar por usuario antes del RANK() lo dejaría siempre en el puesto 1:
+        # su posición es 1 + los mejores resultados que lo superan
+        better = (
+            best.filter(Q(score__gt=OuterRef('score')) | Q(score=OuterRef('score'), duration__lt=OuterRef('duration')))
+            .order_by().values('juego_id').annotate(total=Count('pk')).values('total')
+        )
+        ranked = best.annotate(rank=Coalesce(Subquery(better), Value(0)) + 1)
+    else:
+        ranked = best.annotate(rank=Window(Rank(), order_by=[F('score').desc(), F('duration').asc()]))
+    condition = Q()
+    if limit is not None:
+        condition |= Q(rank__lte=limit)
+    if user_id is not None:
+        condition |= Q(user_id=user_id)
+    rows = (
+        ranked.filter(condition)
+        .order_by('rank', 'user_id')
+        .values('rank', 'user_id', 'user__username', 'user__first_name', 'user__last_name',
+                'score', 'duration', 'played_at')
+    )
+    return [
+        {
+            'rank': row['rank'],
+            'user': {
+                'id': row['user_id'],
+                'name': f"{row['user__first_name']} {row['user__last_name']}".strip() or row['user__username'],
+            },
+            'score': row['score'],
+            'duration': row['duration'],
+            'played_at': row['played_at'],
+        }
+        for row in rows
+    ]
+
+
+def get_leaderboard(game_id, limit=DEFAULT_LIMIT, user_id=None):
+    """
+    (primeras `limit` posiciones, fila del usuario o None). Las primeras
+    MAX_LIMIT posiciones se cachean una vez por versión del juego; la posición
+    de un usuario fuera de ellas se cachea aparte.
+    """
+    version = get_leaderboard_version(game_id)
+    found = {}
+
+    def build_top():
+        # En el mismo RANK() se trae también la fila del usuario
+        rows = _ranked_rows(game_id, MAX_LIMIT, user_id)
+        if user_id is not None:
+            found['mine'] = next((row for row in rows if row['user']['id'] == user_id), None)
+        return [row for row in rows if row['rank'] <= MAX_LIMIT][:MAX_LIMIT]
+
+    top, _ = get_or_build('leaderboard', make_key('leaderboard', game_id, version), build_top)
+    if user_id is None:
+        return top[:limit], None
+
+    mine = next((row for row in top if row['user']['id'] == user_id), None)
+    if mine is None:
+        key = make_key('leaderboard-rank', game_id, version, user_id)
+        if 'mine' in found:
+            # get_or_build no guarda None: se envuelve la fila
+            cached, _ = get_or_build('leaderboard', key, lambda: {'row': found['mine']})
+        else:
+            cached, _ = get_or_build(
+                'leaderboard', key, lambda: {'row': next(iter(_ranked_rows(game_id, user_id=user_id)), None)},
+            )
+        mine = cached['row']
+    return top[:limit], mine
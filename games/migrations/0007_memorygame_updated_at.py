@@ -0,0 +1,20 @@
+# Generated by Django 5.2.7 on 2026-10-18 14:10
+
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('games', '0006_remove_memorygame_leccion_memorygame_curso'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='memorygame',
+            name='updated_at',
+            field=models.DateTimeField(auto_now=True, default=django.utils.timezone.now),
+            preserve_default=False,
+        ),
+    ]
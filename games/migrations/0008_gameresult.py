@@ -0,0 +1,34 @@
+# Generated by Django 5.2.7 on 2026-10-18 14:21
+
+import django.db.models.deletion
+import django.utils.timezone
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('games', '0007_memorygame_updated_at'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='GameResult',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('score', models.PositiveIntegerField()),
+                ('duration', models.PositiveIntegerField(help_text='Duración de la partida en segundos')),
+                ('played_at', models.DateTimeField(default=django.utils.timezone.now)),
+                ('is_best', models.BooleanField(default=False)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('juego', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='results', to='games.memorygame')),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='game_results', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'indexes': [models.Index(condition=models.Q(('is_best', True)), fields=['juego', '-score', 'duration'], name='gameresult_ranking_idx'), models.Index(fields=['user', 'juego'], name='gameresult_user_game_idx')],
+                'constraints': [models.UniqueConstraint(condition=models.Q(('is_best', True)), fields=('juego', 'user'), name='gameresult_one_best_per_user')],
+            },
+        ),
+    ]
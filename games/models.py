@@ -1,4 +1,6 @@
+from django.conf import settings
 from django.db import models
+from django.utils import timezone
 from courses.models import Course
 
 class MemoryGame(models.Model):
@@ -6,6 +8,7 @@ class MemoryGame(models.Model):
     nombre = models.CharField(max_length=100)
     posicion = models.CharField(max_length=20, choices=[('inicio', 'Inicio'), ('mitad', 'Mitad'), ('final', 'Final')])
     grid_size = models.CharField(max_length=10)
+    updated_at = models.DateTimeField(auto_now=True)
     # estado = models.CharField(max_length=20, default='publicado')
 
     def __str__(self):
@@ -18,3 +21,35 @@ class MemoryGamePair(models.Model):
 
     def __str__(self):
         return f"Pair {self.id} - {self.juego.nombre}"
+
+
+class GameResult(models.Model):
+    juego = models.ForeignKey(MemoryGame, on_delete=models.CASCADE, related_name="results")
+    user = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.CASCADE, related_name="game_results")
+    score = models.PositiveIntegerField()
+    duration = models.PositiveIntegerField(help_text="Duración de la partida en segundos")
+    played_at = models.DateTimeField(default=timezone.now)
+    # Mejor resultado del usuario en el juego: es la fila que entra al ranking
+    is_best = models.BooleanField(default=False)
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        indexes = [
+            # Ranking: mejores resultados del juego por puntaje y duración
+            models.Index(
+                fields=["juego", "-score", "duration"],
+                condition=models.Q(is_best=True),
+                name="gameresult_ranking_idx",
+            ),
+            models.Index(fields=["user", "juego"], name="gameresult_user_game_idx"),
+        ]
+        constraints = [
+            models.UniqueConstraint(
+                fields=["juego", "user"],
+                condition=models.Q(is_best=True),
+                name="gameresult_one_best_per_user",
+            ),
+        ]
+
+    def __str__(self):
+        return f"{self.user_id} - {self.juego_id}: {self.score}"
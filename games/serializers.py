@@ -1,17 +1,28 @@
 from rest_framework import serializers
-from .models import MemoryGame, MemoryGamePair
+from core.serializers import DynamicFieldsMixin
+from .models import GameResult, MemoryGame, MemoryGamePair
 
 class MemoryGamePairSerializer(serializers.ModelSerializer):
     class Meta:
         model = MemoryGamePair
         fields = ("id", "question_text", "answer_text")
 
+class MemoryGamePairUpsertSerializer(MemoryGamePairSerializer):
+    # En PUT el id identifica un par existente; sin id se crea uno nuevo
+    id = serializers.IntegerField(required=False, min_value=1)
+
+class GameResultSerializer(serializers.ModelSerializer):
+    class Meta:
+        model = GameResult
+        fields = ("id", "score", "duration", "played_at", "is_best")
+        read_only_fields = ("id", "is_best")
+
 class MemoryGameSerializer(serializers.ModelSerializer):
     class Meta:
         model = MemoryGame
         fields = "__all__" 
 
-class GameWithPairsSerializer(serializers.ModelSerializer):
+class GameWithPairsSerializer(DynamicFieldsMixin, serializers.ModelSerializer):
     pairs = MemoryGamePairSerializer(many=True, read_only=True) 
     class Meta:
         model = MemoryGame
@@ -22,4 +33,5 @@ class GameWithPairsSerializer(serializers.ModelSerializer):
             "grid_size",
             "posicion",
             "pairs"
-        )
\ No newline at end of file
+        )
+        field_prefetches = {"pairs": ("pairs",)}
\ No newline at end of file
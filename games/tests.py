@@ -0,0 +1,112 @@
+from unittest import mock
+
+from django.core.cache import cache
+from rest_framework.test import APITestCase
+
+from courses.models import Course
+from games.boards import build_board
+from games.leaderboard import get_leaderboard
+from games.models import GameResult, MemoryGame, MemoryGamePair
+from users.models import User
+
+
+class GameFixturesMixin:
+    def setUp(self):
+        cache.clear()
+        self.prof = User.objects.create_user('prof', 'prof@x.com', 'pw', rol='1')
+        self.stud = User.objects.create_user('stud', 'stud@x.com', 'pw', rol='2')
+        course = Course.objects.create(
+            profesor=self.prof, titulo='Curso', codigo='C1', descripcion_corta='d', categoria='cat', nivel='basico',
+        )
+        self.game = MemoryGame.objects.create(curso=course, nombre='Juego', posicion='inicio', grid_size='2x2')
+        MemoryGamePair.objects.bulk_create([
+            MemoryGamePair(juego=self.game, question_text=f'P{i}', answer_text=f'R{i}') for i in range(2)
+        ])
+
+
+class PairsPayloadTests(GameFixturesMixin, APITestCase):
+    def test_non_list_bodies_are_rejected(self):
+        self.client.force_authenticate(self.prof)
+        for body in ('"hola"', '5', 'null', '{"pairs": "x"}'):
+            for method, url in (
+                ('PUT', f'/api/games/memory-games/{self.game.pk}/pairs'),
+                ('POST', f'/api/games/memory-games/{self.game.pk}/pairs/bulk'),
+            ):
+                with self.subTest(method=method, body=body):
+                    response = self.client.generic(method, url, body, content_type='application/json')
+                    self.assertEqual(response.status_code, 400)
+        self.assertEqual(self.game.pairs.count(), 2)
+
+    def test_only_the_course_professor_can_replace_pairs(self):
+        url = f'/api/games/memory-games/{self.game.pk}/pairs'
+        body = [{'question_text': 'Nueva', 'answer_text': 'Nueva'}]
+        other = User.objects.create_user('otro', 'otro@x.com', 'pw', rol='1')
+        for user, expected in ((None, 401), (self.stud, 403), (other, 403)):
+            with self.subTest(user=user and user.username):
+                self.client.force_authenticate(user)
+                self.assertEqual(self.client.put(url, body, format='json').status_code, expected)
+                self.assertEqual(sorted(self.game.pairs.values_list('answer_text', flat=True)), ['R0', 'R1'])
+
+        self.client.force_authenticate(self.prof)
+        self.assertEqual(self.client.put(url, body, format='json').status_code, 200)
+        self.assertEqual(list(self.game.pairs.values_list('answer_text', flat=True)), ['Nueva'])
+
+    def test_wrapped_list_is_accepted(self):
+        self.client.force_authenticate(self.prof)
+        response = self.client.post(
+            f'/api/games/memory-games/{self.game.pk}/pairs/bulk',
+            {'pairs': [{'question_text': 'P2', 'answer_text': 'R2'}]}, format='json',
+        )
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(self.game.pairs.count(), 3)
+
+
+class BoardTests(GameFixturesMixin, APITestCase):
+    def test_cached_board_is_not_shared(self):
+        board = build_board(self.game.pk, '2x2', 'v1', 'semilla')
+        expected = build_board(self.game.pk, '2x2', 'v1', 'semilla')
+        board['pairs'][0]['answer_text'] = 'cambiado'
+        board['layout'][0][0][1] = 9
+        board['layout'].clear()
+        self.assertEqual(build_board(self.game.pk, '2x2', 'v1', 'semilla'), expected)
+
+    def test_same_seed_same_board(self):
+        url = f'/api/games/memory-games/{self.game.pk}/board'
+        first = self.client.get(url, {'seed': 'clase-1'}).data
+        self.assertEqual(self.client.get(url, {'seed': 'clase-1'}).data, first)
+        self.assertEqual(sorted(card for row in first['layout'] for card in row), [[0, 0], [0, 1], [1, 0], [1, 1]])
+
+
+@mock.patch('games.leaderboard.MAX_LIMIT', 2)
+class LeaderboardTests(GameFixturesMixin, APITestCase):
+    def setUp(self):
+        super().setUp()
+        # (puntaje, duración) de cada usuario; u2 y u3 empatan en el puesto 3
+        self.players = []
+        for i, (score, duration) in enumerate([(90, 10), (80, 10), (70, 20), (70, 20), (70, 30)]):
+            user = User.objects.create_user(f'u{i}', f'u{i}@x.com', 'pw', rol='2')
+            GameResult.objects.create(juego=self.game, user=user, score=score, duration=duration, is_best=True)
+            self.players.append(user)
+
+    def rank_of(self, user):
+        top, mine = get_leaderboard(self.game.pk, 10, user.pk)
+        self.assertEqual([row['rank'] for row in top], [1, 2])
+        return mine['rank']
+
+    def test_rank_outside_top_on_cold_cache(self):
+        self.assertEqual(self.rank_of(self.players[4]), 5)
+
+    def test_rank_outside_top_on_warm_cache(self):
+        get_leaderboard(self.game.pk)
+        self.assertEqual([self.rank_of(user) for user in self.players], [1, 2, 3, 3, 5])
+
+
+class SubmitResultsTests(GameFixturesMixin, APITestCase):
+    def test_submit_rejects_non_list_bodies(self):
+        self.client.force_authenticate(self.stud)
+        for body in ('"hola"', '5', '{"results": 3}'):
+            with self.subTest(body=body):
+                response = self.client.post(
+                    f'/api/games/memory-games/{self.game.pk}/results', body, content_type='application/json',
+                )
+                self.assertEqual(response.status_code, 400)
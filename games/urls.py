@@ -1,5 +1,6 @@
 from django.urls import path
-from .views import CreateMemoryGame, AddPairToMemoryGame, GetMemoryGame, ListMemoryGamePairs, GetMemoryGameFull, AddPairsBulk, GetMemoryGameByCourseFull
+from .views import CreateMemoryGame, AddPairToMemoryGame, GetMemoryGame, ListMemoryGamePairs, GetMemoryGameFull, GetMemoryGameBoard, AddPairsBulk, GetMemoryGameByCourseFull
+from .views import SubmitGameResults, GetMemoryGameLeaderboard
 
 urlpatterns = [
     path('memory-games/create', CreateMemoryGame.as_view()), #probado
@@ -7,6 +8,9 @@ urlpatterns = [
     path('memory-games/<int:game_id>/pairs', AddPairToMemoryGame.as_view()), #probado
     path('memory-games/<int:id>', GetMemoryGame.as_view()), #probado
     path('memory-games/<int:id>/full', GetMemoryGameFull.as_view()),
+    path('memory-games/<int:id>/board', GetMemoryGameBoard.as_view()),
+    path('memory-games/<int:id>/results', SubmitGameResults.as_view()),
+    path('memory-games/<int:id>/leaderboard', GetMemoryGameLeaderboard.as_view()),
     path("memory-games/<int:game_id>/pairs/bulk", AddPairsBulk.as_view()),
     path('memory-games/by-course/<str:public_code>/full', GetMemoryGameByCourseFull.as_view()),
 ]
@@ -1,14 +1,107 @@
 from rest_framework.views import APIView
 from rest_framework.response import Response
 from rest_framework import status
-from .models import MemoryGame # Asegúrate de que MemoryGame apunta al modelo actualizado
-from .serializers import MemoryGameSerializer, MemoryGamePairSerializer, GameWithPairsSerializer
+from rest_framework.permissions import IsAuthenticated
+from .boards import build_board, clean_seed
+from .leaderboard import DEFAULT_LIMIT, MAX_LIMIT, MAX_RESULTS_PER_BATCH, get_leaderboard, record_results
+from .models import MemoryGame, MemoryGamePair
+from .serializers import (
+    GameResultSerializer,
+    GameWithPairsSerializer,
+    MemoryGameSerializer,
+    MemoryGamePairSerializer,
+    MemoryGamePairUpsertSerializer,
+)
 import logging
 from django.db import transaction
 import traceback
 from  courses.models import Course
+from django.db.models import Count, Max
+from core.responses import add_validators, make_etag, not_modified
+from core.serializers import fieldset_key
 logger = logging.getLogger(__name__)
+from django.core.exceptions import ValidationError as DjangoValidationError
+from django.http import Http404
 from django.shortcuts import get_object_or_404
+
+
+def game_version(queryset):
+    """Datos de versión del juego en una sola consulta, sin cargar los pares."""
+    return (
+        queryset.annotate(pair_count=Count('pairs'), max_pair_id=Max('pairs__id'))
+        .values('id', 'grid_size', 'updated_at', 'pair_count', 'max_pair_id')
+        .order_by('id')
+        .first()
+    )
+
+
+def game_etag(version, request):
+    return make_etag(
+        'memory-game', version['id'], version['updated_at'], version['pair_count'], version['max_pair_id'],
+        fieldset_key(request),
+    )
+
+
+def pairs_payload(data):
+    """Lista de pares del cuerpo: [...] o {"pairs": [...]}; None si no es una lista."""
+    if isinstance(data, list):
+        return data
+    # Un JSON válido también puede ser un texto o un número
+    pairs = data.get("pairs") if isinstance(data, dict) else None
+    return pairs if isinstance(pairs, list) else None
+
+
+def pair_errors(serializer, pairs_data):
+    """Respuesta 400 con el primer par inválido de un serializer many=True."""
+    index = next(i for i, errors in enumerate(serializer.errors) if errors)
+    return Response({
+        "error": f"Error en el par #{index + 1}",
+        "details": serializer.errors[index],
+        "pair_data": pairs_data[index],
+    }, status=400)
+
+
+def replace_pairs(game, items):
+    """
+    Deja en el juego exactamente los pares de `items` con el mínimo de
+    escrituras: un bulk_create, un bulk_update y un DELETE. Los pares con id
+    se actualizan si cambiaron; los que no traen id conservan un par
+    existente idéntico si queda alguno libre; el resto de pares se borra.
+    Devuelve (creados, actualizados, borrados).
+    """
+    existing = {pair.id: pair for pair in game.pairs.all()}
+    to_update, pending = [], []
+    for item in items:
+        pair = existing.pop(item["id"], None) if "id" in item else None
+        if pair is None:
+            pending.append(item)
+            continue
+        question, answer = item.get("question_text"), item["answer_text"]
+        if (pair.question_text, pair.answer_text) != (question, answer):
+            pair.question_text, pair.answer_text = question, answer
+            to_update.append(pair)
+
+    # Pares sin id iguales a uno existente no referenciado: se conservan
+    free = {}
+    for pair in existing.values():
+        free.setdefault((pair.question_text, pair.answer_text), []).append(pair)
+    to_create = []
+    for item in pending:
+        matches = free.get((item.get("question_text"), item["answer_text"]))
+        if matches:
+            existing.pop(matches.pop().id)
+        else:
+            to_create.append(MemoryGamePair(
+                juego=game, question_text=item.get("question_text"), answer_text=item["answer_text"],
+            ))
+
+    MemoryGamePair.objects.bulk_create(to_create)
+    MemoryGamePair.objects.bulk_update(to_update, ["question_text", "answer_text"])
+    if existing:
+        MemoryGamePair.objects.filter(pk__in=list(existing)).delete()
+    return len(to_create), len(to_update), len(existing)
+
+
 # ----------------------------------------------------
 # GET /memory-games/{id}
 # ----------------------------------------------------
@@ -27,6 +120,12 @@ class GetMemoryGame(APIView):
 # GET /memory-games/{id}/pairs
 # ----------------------------------------------------
 class ListMemoryGamePairs(APIView):
+    def get_permissions(self):
+        # Ver los pares es público; reemplazarlos requiere sesión
+        if self.request.method == "PUT":
+            return [IsAuthenticated()]
+        return super().get_permissions()
+
     def get(self, request, id):
         try:
             try:
@@ -46,7 +145,61 @@ class ListMemoryGamePairs(APIView):
                 {"error": "Ocurrió un error interno al procesar la solicitud."}, 
                 status=status.HTTP_500_INTERNAL_SERVER_ERROR
             )
-            
+
+    # PUT /memory-games/{id}/pairs: reemplaza el conjunto de pares del juego
+    def put(self, request, id):
+        owner = MemoryGame.objects.filter(id=id).values_list("curso__profesor_id", flat=True).first()
+        if owner is None:
+            return Response({"error": "El juego no existe"}, status=status.HTTP_404_NOT_FOUND)
+        if owner != request.user.pk:
+            return Response(
+                {"error": "Solo el profesor del curso puede modificar los pares del juego"},
+                status=status.HTTP_403_FORBIDDEN,
+            )
+
+        pairs_data = pairs_payload(request.data)
+        if pairs_data is None:
+            return Response({"error": "Debe enviar una lista de pares"}, status=400)
+
+        serializer = MemoryGamePairUpsertSerializer(data=pairs_data, many=True)
+        if not serializer.is_valid():
+            return pair_errors(serializer, pairs_data)
+        items = serializer.validated_data
+        ids = [item["id"] for item in items if "id" in item]
+        if len(ids) != len(set(ids)):
+            return Response({"error": "Hay pares repetidos (mismo id)"}, status=400)
+
+        try:
+            with transaction.atomic():
+                # Bloquea el juego para que dos reemplazos no se mezclen
+                game = MemoryGame.objects.select_for_update().filter(id=id).first()
+                if game is None:
+                    return Response({"error": "El juego no existe"}, status=status.HTTP_404_NOT_FOUND)
+                unknown = set(ids) - set(game.pairs.values_list("id", flat=True))
+                if unknown:
+                    return Response(
+                        {"error": "Pares que no pertenecen al juego", "ids": sorted(unknown)},
+                        status=400,
+                    )
+                created, updated, deleted = replace_pairs(game, items)
+                if created or updated or deleted:
+                    # Cambia la versión (ETag) del juego y del curso
+                    game.save(update_fields=["updated_at"])
+        except Exception as e:
+            logger.error(f"Error al reemplazar los pares del juego {id}: {e}", exc_info=True)
+            return Response(
+                {"error": "Ocurrió un error interno al procesar la solicitud."},
+                status=status.HTTP_500_INTERNAL_SERVER_ERROR
+            )
+
+        return Response({
+            "message": "Pares actualizados correctamente",
+            "created": created,
+            "updated": updated,
+            "deleted": deleted,
+            "pairs": MemoryGamePairSerializer(game.pairs.order_by("id"), many=True).data,
+        }, status=status.HTTP_200_OK)
+
 # ----------------------------------------------------
 # POST /memory-games (CORREGIDO)
 # ----------------------------------------------------
@@ -115,13 +268,17 @@ class AddPairToMemoryGame(APIView):
 class GetMemoryGameFull(APIView):
     def get(self, request, id):
         try:
-            try:
-                game = MemoryGame.objects.get(id=id)
-            except MemoryGame.DoesNotExist:
+            version = game_version(MemoryGame.objects.filter(id=id))
+            if version is None:
                 return Response({"error": "El juego no existe"}, status=404)
 
-            serializer = GameWithPairsSerializer(game)
-            return Response(serializer.data, status=200)
+            etag = game_etag(version, request)
+            response = not_modified(request, etag, version['updated_at'])
+            if response is None:
+                queryset = GameWithPairsSerializer.narrow_queryset(MemoryGame.objects.prefetch_related('pairs'), request)
+                serializer = GameWithPairsSerializer(queryset.get(id=id), context={'request': request})
+                response = Response(serializer.data, status=200)
+            return add_validators(response, etag, version['updated_at'])
         except Exception as e:
             logger.error(f"Error al listar todo el juego {id}: {e}", exc_info=True)
 
@@ -133,11 +290,13 @@ class GetMemoryGameFull(APIView):
 class GetMemoryGameByCourseFull(APIView):
     def get(self, request, public_code):
         try:
-            course = get_object_or_404(Course, codigo=public_code)
-            game = MemoryGame.objects.get(curso=course)
-        
-        except MemoryGame.DoesNotExist:
-         return Response({"game": None, "pairs": []}, status=status.HTTP_200_OK)
+            version = game_version(MemoryGame.objects.filter(curso__codigo=public_code))
+            if version is None:
+                get_object_or_404(Course, codigo=public_code)
+                return Response({"game": None, "pairs": []}, status=status.HTTP_200_OK)
+
+        except Http404:
+            raise
 
         except Exception:
             return Response(
@@ -145,9 +304,115 @@ class GetMemoryGameByCourseFull(APIView):
                 status=status.HTTP_500_INTERNAL_SERVER_ERROR
             )
 
-        serializer = GameWithPairsSerializer(game)
-        return Response(serializer.data, status=status.HTTP_200_OK)
+        etag = game_etag(version, request)
+        response = not_modified(request, etag, version['updated_at'])
+        if response is None:
+            queryset = GameWithPairsSerializer.narrow_queryset(MemoryGame.objects.prefetch_related('pairs'), request)
+            serializer = GameWithPairsSerializer(queryset.get(id=version['id']), context={'request': request})
+            response = Response(serializer.data, status=status.HTTP_200_OK)
+        return add_validators(response, etag, version['updated_at'])
     
+# ----------------------------------------------------
+# GET /memory-games/{id}/board?seed=
+# ----------------------------------------------------
+class GetMemoryGameBoard(APIView):
+    def get(self, request, id):
+        version = game_version(MemoryGame.objects.filter(id=id))
+        if version is None:
+            return Response({"error": "El juego no existe"}, status=status.HTTP_404_NOT_FOUND)
+
+        requested_seed = request.query_params.get("seed")
+        try:
+            seed = clean_seed(requested_seed)
+        except DjangoValidationError as e:
+            return Response({"error": e.messages[0]}, status=status.HTTP_400_BAD_REQUEST)
+
+        # Solo con semilla explícita el tablero es el mismo en cada petición
+        etag = make_etag(
+            'memory-board', version['id'], version['updated_at'], version['pair_count'], version['max_pair_id'], seed,
+        )
+        last_modified = version['updated_at'] if requested_seed else None
+        if requested_seed:
+            response = not_modified(request, etag, last_modified)
+            if response is not None:
+                return response
+
+        try:
+            board = build_board(
+                version["id"],
+                version["grid_size"],
+                (version["updated_at"], version["pair_count"], version["max_pair_id"]),
+                seed,
+            )
+        except DjangoValidationError as e:
+            return Response({"error": e.messages[0]}, status=status.HTTP_400_BAD_REQUEST)
+        return add_validators(Response(board, status=status.HTTP_200_OK), etag, last_modified)
+
+
+# ----------------------------------------------------
+# POST /memory-games/{id}/results
+# ----------------------------------------------------
+class SubmitGameResults(APIView):
+    permission_classes = [IsAuthenticated]
+
+    def post(self, request, id):
+        game = MemoryGame.objects.filter(id=id).first()
+        if game is None:
+            return Response({"error": "El juego no existe"}, status=status.HTTP_404_NOT_FOUND)
+
+        data = request.data
+        if isinstance(data, list):
+            results_data = data
+        else:
+            # Un JSON válido también puede ser un texto o un número
+            results_data = data.get("results") if isinstance(data, dict) else None
+        if not isinstance(results_data, list) or not results_data:
+            return Response({"error": "Debe enviar una lista de resultados"}, status=400)
+        if len(results_data) > MAX_RESULTS_PER_BATCH:
+            return Response(
+                {"error": f"Se permiten como máximo {MAX_RESULTS_PER_BATCH} resultados por envío"},
+                status=400,
+            )
+
+        serializer = GameResultSerializer(data=results_data, many=True)
+        if not serializer.is_valid():
+            index = next(i for i, errors in enumerate(serializer.errors) if errors)
+            return Response({
+                "error": f"Error en el resultado #{index + 1}",
+                "details": serializer.errors[index],
+            }, status=400)
+
+        results, best, improved = record_results(game, request.user, serializer.validated_data)
+        return Response({
+            "message": "Resultados guardados correctamente",
+            "created": len(results),
+            "new_best": improved,
+            "best": GameResultSerializer(best).data,
+        }, status=status.HTTP_201_CREATED)
+
+
+# ----------------------------------------------------
+# GET /memory-games/{id}/leaderboard?limit=
+# ----------------------------------------------------
+class GetMemoryGameLeaderboard(APIView):
+    def get(self, request, id):
+        try:
+            limit = int(request.query_params.get("limit", DEFAULT_LIMIT))
+            if not 1 <= limit <= MAX_LIMIT:
+                raise ValueError
+        except ValueError:
+            return Response(
+                {"error": f"Parámetro inválido: limit debe ser un entero entre 1 y {MAX_LIMIT}."},
+                status=400,
+            )
+        if not MemoryGame.objects.filter(id=id).exists():
+            return Response({"error": "El juego no existe"}, status=status.HTTP_404_NOT_FOUND)
+
+        user_id = request.user.pk if request.user.is_authenticated else None
+        top, mine = get_leaderboard(id, limit, user_id)
+        return Response({"game": id, "results": top, "me": mine}, status=status.HTTP_200_OK)
+
+
 class AddPairsBulk(APIView):
     def post(self, request, game_id):
         try:
@@ -155,29 +420,23 @@ class AddPairsBulk(APIView):
         except MemoryGame.DoesNotExist:
             return Response({"error": "El juego no existe"}, status=404)
 
-        pairs_data = request.data.get("pairs", [])
+        pairs_data = pairs_payload(request.data)
 
-        if not isinstance(pairs_data, list) or len(pairs_data) == 0:
+        if not pairs_data:
             return Response({"error": "Debe enviar una lista de pares"}, status=400)
 
-        created_pairs = []
+        # Se valida todo el lote antes de escribir y se inserta en un solo INSERT
+        serializer = MemoryGamePairSerializer(data=pairs_data, many=True)
+        if not serializer.is_valid():
+            return pair_errors(serializer, pairs_data)
 
         try:
             with transaction.atomic():
-                for index, pair in enumerate(pairs_data):
-                    serializer = MemoryGamePairSerializer(data=pair)
-
-                    if serializer.is_valid():
-                        created = serializer.save(juego=game) 
-                        created_pairs.append(created)
-                    else:
-                        # Se puede usar raise serializers.ValidationError para DRF estándar
-                        transaction.set_rollback(True)
-                        return Response({
-                            "error": f"Error en el par #{index + 1}",
-                            "details": serializer.errors,
-                            "pair_data": pair
-                        }, status=400)
+                created_pairs = MemoryGamePair.objects.bulk_create(
+                    [MemoryGamePair(juego=game, **item) for item in serializer.validated_data]
+                )
+                # bulk_create no actualiza el juego: se toca para cambiar su versión
+                game.save(update_fields=["updated_at"])
 
         except Exception as e:
             logger.error(f"Error en AddPairsBulk para el juego {game_id}: {traceback.format_exc()}", exc_info=True)
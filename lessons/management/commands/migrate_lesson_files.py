@@ -0,0 +1,26 @@
+from django.core.exceptions import ValidationError
+from django.core.management.base import BaseCommand
+
+from lessons.models import Lesson
+
+
+class Command(BaseCommand):
+    help = 'Mueve los PDFs guardados en base64 en Lesson.file al almacenamiento de blobs.'
+
+    def handle(self, *args, **options):
+        pending = (
+            Lesson.objects.filter(file_sha256__isnull=True, file__isnull=False)
+            .exclude(file='')
+            .values_list('pk', flat=True)
+        )
+        migrated = failed = 0
+        for pk in list(pending):
+            # Se carga una lección a la vez para no tener varios PDFs en memoria
+            lesson = Lesson.objects.only('id', 'file', 'file_sha256', 'file_size').get(pk=pk)
+            try:
+                lesson.migrate_legacy_file()
+                migrated += 1
+            except ValidationError:
+                failed += 1
+                self.stderr.write(f'Lección {pk}: el archivo no es un base64 válido.')
+        self.stdout.write(self.style.SUCCESS(f'{migrated} archivos migrados, {failed} con errores.'))
@@ -0,0 +1,23 @@
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+
+from lessons.models import LessonUpload
+
+
+class Command(BaseCommand):
+    help = 'Elimina las subidas por partes abandonadas y sus archivos temporales.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--hours', type=int, default=24, help='Antigüedad mínima desde la última parte recibida.')
+
+    def handle(self, *args, **options):
+        limit = timezone.now() - timedelta(hours=options['hours'])
+        stale = LessonUpload.objects.filter(updated_at__lt=limit)
+        count = 0
+        for upload in stale.iterator():
+            upload.discard_temp_file()
+            upload.delete()
+            count += 1
+        self.stdout.write(self.style.SUCCESS(f'{count} subidas eliminadas.'))
@@ -0,0 +1,28 @@
+# Generated by Django 5.2.7 on 2026-10-18 13:50
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('lessons', '0007_alter_lesson_options_alter_lesson_unique_together_and_more'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='lesson',
+            name='file_sha256',
+            field=models.CharField(blank=True, max_length=64, null=True),
+        ),
+        migrations.AddField(
+            model_name='lesson',
+            name='file_size',
+            field=models.PositiveBigIntegerField(blank=True, null=True),
+        ),
+        migrations.AlterField(
+            model_name='lesson',
+            name='file',
+            field=models.TextField(blank=True, help_text='PDF en base64 (legado)', null=True),
+        ),
+    ]
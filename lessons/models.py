@@ -1,9 +1,18 @@
+import io
+import math
+import uuid
+from pathlib import Path
+
 from django.db import models
 from django.conf import settings
 from django.core.exceptions import ValidationError
+from django.urls import reverse
 from django.utils import timezone
+from core.storage import get_blob_storage
+from core.utils import decode_base64_file
 from courses.models import Course
-from courses.utils import update_course_progress
+from courses.stats import record_lesson_completions
+from courses.utils import apply_progress_delta
 
 
 def validate_file_extension(value):
@@ -16,13 +25,34 @@ def lesson_file_path(instance, filename):
     return f'lessons/files/{filename}'
 
 
+class LessonQuerySet(models.QuerySet):
+    def with_file_flag(self):
+        """
+        Anota `has_legacy_file` (PDF aún en base64 en `file`) sin leer la
+        columna, para que `has_file` funcione cuando `file` está diferido.
+        """
+        return self.annotate(
+            has_legacy_file=models.Case(
+                models.When(models.Q(file__isnull=True) | models.Q(file=''), then=models.Value(False)),
+                default=models.Value(True),
+                output_field=models.BooleanField(),
+            )
+        )
+
+
 class Lesson(models.Model):
     course = models.ForeignKey(Course, on_delete=models.CASCADE, related_name='lessons', null=True, blank=True)
     title = models.CharField(max_length=150)
     content = models.TextField(blank=True, null=True)
-    file = models.TextField(blank=True, null=True, help_text="PDF en base64")
+    # Legado: antes el PDF se guardaba completo en base64 dentro de la fila
+    file = models.TextField(blank=True, null=True, help_text="PDF en base64 (legado)")
+    file_sha256 = models.CharField(max_length=64, blank=True, null=True)
+    file_size = models.PositiveBigIntegerField(blank=True, null=True)
     is_game_linked = models.BooleanField(default=False)
     created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    objects = LessonQuerySet.as_manager()
 
     class Meta:
         ordering = ['created_at']
@@ -35,6 +65,37 @@ class Lesson(models.Model):
             if existing.exists():
                 raise ValidationError("Solo puede haber una lección con juego por curso.")
 
+    @property
+    def has_file(self):
+        if self.file_sha256:
+            return True
+        # Lecciones antiguas sin migrar: el PDF sigue en base64 (comando migrate_lesson_files)
+        if hasattr(self, 'has_legacy_file'):
+            return self.has_legacy_file
+        return bool(self.file)
+
+    def get_file_url(self, request=None):
+        if not self.has_file:
+            return ''
+        url = reverse('lesson-file', kwargs={'pk': self.pk})
+        return request.build_absolute_uri(url) if request is not None else url
+
+    def attach_file(self, stream):
+        """Guarda el PDF en el almacenamiento de blobs y lo asocia a la lección (sin guardar)."""
+        self.file_sha256, self.file_size = get_blob_storage('lessons').save(stream)
+        self.file = None
+
+    def attach_base64_file(self, value):
+        self.attach_file(io.BytesIO(decode_base64_file(value)))
+
+    def migrate_legacy_file(self):
+        """Mueve el PDF en base64 de la columna `file` al almacenamiento de blobs."""
+        if self.file_sha256 or not self.file:
+            return False
+        self.attach_base64_file(self.file)
+        self.save(update_fields=['file', 'file_sha256', 'file_size', 'updated_at'])
+        return True
+
     def __str__(self):
         # Course mantiene campo Python 'titulo' (db_column 'title')
         course_title = getattr(self.course, 'titulo', None) or ''
@@ -56,11 +117,52 @@ class LessonProgress(models.Model):
                 self.completed_at = timezone.now()
         else:
             self.completed_at = None
+        # CourseProgress lo ajusta courses.utils.set_lesson_completed solo
+        # cuando el estado cambia, sin recontar todo el curso
         super().save(*args, **kwargs)
-        update_course_progress(self.user, self.lesson.course)
 
     def delete(self, *args, **kwargs):
-        user = self.user
-        course = self.lesson.course
-        super().delete(*args, **kwargs)
-        update_course_progress(user, course)
+        user_id, course_id, completed = self.user_id, self.lesson.course_id, self.completed
+        result = super().delete(*args, **kwargs)
+        if completed:
+            apply_progress_delta(user_id, course_id, -1)
+            record_lesson_completions({self.lesson_id: -1})
+        return result
+
+
+class LessonUpload(models.Model):
+    """Sesión de subida por partes (reanudable) del PDF de una lección."""
+    STATUS_CHOICES = [
+        ('pending', 'Pendiente'),
+        ('completed', 'Completada'),
+    ]
+
+    id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
+    user = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.CASCADE, related_name='lesson_uploads')
+    lesson = models.ForeignKey(Lesson, on_delete=models.CASCADE, related_name='uploads')
+    total_size = models.PositiveBigIntegerField()
+    chunk_size = models.PositiveIntegerField()
+    received_chunks = models.PositiveIntegerField(default=0)
+    status = models.CharField(max_length=20, choices=STATUS_CHOICES, default='pending')
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    @property
+    def total_chunks(self):
+        return math.ceil(self.total_size / self.chunk_size)
+
+    @property
+    def received_bytes(self):
+        return min(self.received_chunks * self.chunk_size, self.total_size)
+
+    @property
+    def temp_path(self):
+        return Path(settings.LESSON_UPLOAD_TEMP_DIR) / f'{self.id}.part'
+
+    def chunk_length(self, index):
+        """Tamaño esperado de la parte `index` (la última puede ser más corta)."""
+        return min(self.chunk_size, self.total_size - index * self.chunk_size)
+
+    def discard_temp_file(self):
+        if self.temp_path.exists():
+            self.temp_path.unlink()
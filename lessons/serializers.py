@@ -1,16 +1,26 @@
 from rest_framework import serializers
+from django.conf import settings
+from django.core.exceptions import ValidationError as DjangoValidationError
 from django.http import QueryDict
-from .models import Lesson
+from core.serializers import DynamicFieldsMixin
+from .models import Lesson, LessonUpload
+from .utils import PDF_MAGIC
 
 
-class LessonSerializer(serializers.ModelSerializer):
-    file = serializers.CharField(required=False, allow_blank=True, allow_null=True)
+class LessonSerializer(DynamicFieldsMixin, serializers.ModelSerializer):
+    # Se sigue aceptando el PDF en base64 al escribir, pero se guarda en el
+    # almacenamiento de blobs y nunca se devuelve en las respuestas.
+    file = serializers.CharField(required=False, allow_blank=True, allow_null=True, write_only=True)
+    file_url = serializers.SerializerMethodField()
 
     class Meta:
         model = Lesson
         fields = '__all__'
-        read_only_fields = ['id', 'created_at']
+        read_only_fields = ['id', 'created_at', 'file_sha256', 'file_size']
+        field_sources = {'file_url': ('file_sha256',)}
 
+    def get_file_url(self, obj):
+        return obj.get_file_url(self.context.get('request'))
 
     def validate(self, attrs):
         course = attrs.get('course') or getattr(self.instance, 'course', None)
@@ -26,3 +36,78 @@ class LessonSerializer(serializers.ModelSerializer):
             if qs.exists():
                 raise serializers.ValidationError({"is_game_linked": "Solo puede haber una lección vinculada a un juego por curso."})
         return attrs
+
+    def _apply_file(self, instance, validated_data):
+        if 'file' not in validated_data:
+            return
+        value = validated_data.pop('file')
+        if value:
+            try:
+                instance.attach_base64_file(value)
+            except DjangoValidationError as exc:
+                raise serializers.ValidationError({"file": exc.messages})
+        else:
+            instance.file = None
+            instance.file_sha256 = None
+            instance.file_size = None
+
+    def create(self, validated_data):
+        instance = Lesson(**{k: v for k, v in validated_data.items() if k != 'file'})
+        self._apply_file(instance, validated_data)
+        instance.save()
+        return instance
+
+    def update(self, instance, validated_data):
+        self._apply_file(instance, validated_data)
+        return super().update(instance, validated_data)
+
+
+class LessonListSerializer(serializers.ModelSerializer):
+    """Solo metadatos: no incluye el contenido ni el archivo de la lección."""
+    has_file = serializers.BooleanField(read_only=True)
+
+    class Meta:
+        model = Lesson
+        fields = ('id', 'course', 'title', 'is_game_linked', 'created_at', 'has_file', 'file_size')
+        read_only_fields = fields
+
+
+class LessonContentSerializer(serializers.ModelSerializer):
+    file_url = serializers.SerializerMethodField()
+
+    class Meta:
+        model = Lesson
+        fields = ('id', 'content', 'file_url', 'file_size', 'file_sha256')
+        read_only_fields = fields
+
+    def get_file_url(self, obj):
+        return obj.get_file_url(self.context.get('request'))
+
+
+class LessonUploadSerializer(serializers.ModelSerializer):
+    total_chunks = serializers.IntegerField(read_only=True)
+    received_bytes = serializers.IntegerField(read_only=True)
+
+    class Meta:
+        model = LessonUpload
+        fields = (
+            'id',
+            'lesson',
+            'total_size',
+            'chunk_size',
+            'total_chunks',
+            'received_chunks',
+            'received_bytes',
+            'status',
+            'created_at',
+        )
+        read_only_fields = ('id', 'chunk_size', 'received_chunks', 'status', 'created_at')
+
+    def validate_total_size(self, value):
+        if value < len(PDF_MAGIC):
+            raise serializers.ValidationError("El archivo está vacío.")
+        if value > settings.LESSON_UPLOAD_MAX_SIZE:
+            raise serializers.ValidationError(
+                f"El archivo supera el tamaño máximo permitido ({settings.LESSON_UPLOAD_MAX_SIZE} bytes)."
+            )
+        return value
@@ -0,0 +1,189 @@
+import base64
+import hashlib
+import io
+import re
+import shutil
+import tempfile
+from datetime import timedelta
+from pathlib import Path
+
+from django.core.cache import cache
+from django.core.management import call_command
+from django.db import connection
+from django.test import override_settings
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+from rest_framework.test import APITestCase
+
+from core.storage import get_blob_storage
+from courses.models import Course, CourseSubscription
+from users.models import User
+from lessons.models import Lesson, LessonUpload
+
+
+PDF = b'%PDF-1.4 ' + b'x' * 1000
+# La columna base64 en la lista del SELECT
+FILE_COLUMN = re.compile(r'"lessons_lesson"\."file"(,| FROM)')
+
+
+class TempStorageTestCase(APITestCase):
+    """Blobs y subidas en un directorio temporal, vaciado tras cada test."""
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls._root = Path(tempfile.mkdtemp())
+        cls._settings = override_settings(
+            BLOB_STORAGES={
+                name: {
+                    'BACKEND': 'core.storage.LocalBlobStorage',
+                    'OPTIONS': {'location': cls._root / 'blobs' / name},
+                }
+                for name in ('lessons', 'covers')
+            },
+            LESSON_UPLOAD_TEMP_DIR=cls._root / 'uploads',
+        )
+        cls._settings.enable()
+
+    @classmethod
+    def tearDownClass(cls):
+        cls._settings.disable()
+        shutil.rmtree(cls._root, ignore_errors=True)
+        super().tearDownClass()
+
+    def setUp(self):
+        get_blob_storage.cache_clear()
+        cache.clear()
+        self.prof = User.objects.create_user('prof', 'prof@x.com', 'pw', rol='1')
+        self.stud = User.objects.create_user('stud', 'stud@x.com', 'pw', rol='2')
+        self.course = Course.objects.create(
+            profesor=self.prof, titulo='Curso', codigo='C1', descripcion_corta='d', categoria='cat', nivel='basico',
+        )
+        CourseSubscription.objects.create(user=self.stud, course=self.course)
+
+    def tearDown(self):
+        get_blob_storage.cache_clear()
+        # Cada test empieza sin blobs ni archivos temporales
+        for name in ('blobs', 'uploads'):
+            shutil.rmtree(self._root / name, ignore_errors=True)
+
+
+class LegacyLessonFileTests(TempStorageTestCase):
+    def setUp(self):
+        super().setUp()
+        self.client.force_authenticate(self.stud)
+
+    def test_legacy_file_is_served_without_loading_it_elsewhere(self):
+        lesson = Lesson.objects.create(course=self.course, title='L', file=base64.b64encode(PDF).decode())
+
+        listed = self.client.get('/api/lessons/', {'course': self.course.pk}).data['results'][0]
+        self.assertTrue(listed['has_file'])
+        for url in (f'/api/lessons/{lesson.pk}/', f'/api/lessons/{lesson.pk}/content/'):
+            with self.subTest(url=url), CaptureQueriesContext(connection) as queries:
+                response = self.client.get(url)
+            self.assertTrue(response.data['file_url'].endswith(f'/api/lessons/{lesson.pk}/file/'))
+            self.assertEqual([query['sql'] for query in queries if FILE_COLUMN.search(query['sql'])], [])
+
+        response = self.client.get(f'/api/lessons/{lesson.pk}/file/')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(b''.join(response.streaming_content), PDF)
+        # La descarga no escribe: la migración la hace el comando
+        lesson.refresh_from_db()
+        self.assertIsNone(lesson.file_sha256)
+
+        call_command('migrate_lesson_files', stdout=io.StringIO())
+        lesson.refresh_from_db()
+        self.assertIsNone(lesson.file)
+        response = self.client.get(f'/api/lessons/{lesson.pk}/file/')
+        self.assertEqual(b''.join(response.streaming_content), PDF)
+
+    def test_lesson_without_file(self):
+        lesson = Lesson.objects.create(course=self.course, title='L')
+        listed = self.client.get('/api/lessons/', {'course': self.course.pk}).data['results'][0]
+        self.assertFalse(listed['has_file'])
+        self.assertEqual(self.client.get(f'/api/lessons/{lesson.pk}/file/').status_code, 404)
+
+    def test_corrupt_legacy_file_returns_404(self):
+        lesson = Lesson.objects.create(course=self.course, title='L', file='no es base64 !!')
+        self.assertEqual(self.client.get(f'/api/lessons/{lesson.pk}/file/').status_code, 404)
+
+
+@override_settings(LESSON_UPLOAD_CHUNK_SIZE=4000)
+class LessonUploadTests(TempStorageTestCase):
+    DATA = b'%PDF-1.7\n' + bytes(range(256)) * 40
+
+    def setUp(self):
+        super().setUp()
+        self.client.force_authenticate(self.prof)
+        self.lesson = Lesson.objects.create(course=self.course, title='L')
+        response = self.client.post(
+            '/api/lessons/uploads/', {'lesson': self.lesson.pk, 'total_size': len(self.DATA)}, format='json',
+        )
+        self.upload_id = response.data['id']
+        self.total_chunks = response.data['total_chunks']
+
+    def put_chunk(self, index, body=None):
+        body = self.DATA[index * 4000:(index + 1) * 4000] if body is None else body
+        return self.client.generic(
+            'PUT', f'/api/lessons/uploads/{self.upload_id}/chunks/{index}/', body,
+            content_type='application/octet-stream', HTTP_X_CHUNK_SHA256=hashlib.sha256(body).hexdigest(),
+        )
+
+    def stored_blobs(self):
+        root = Path(get_blob_storage('lessons').location)
+        return [path for path in root.rglob('*') if path.is_file()] if root.exists() else []
+
+    def test_upload_and_complete(self):
+        for index in range(self.total_chunks):
+            self.assertEqual(self.put_chunk(index).status_code, 200)
+        response = self.client.post(
+            f'/api/lessons/uploads/{self.upload_id}/complete/',
+            {'sha256': hashlib.sha256(self.DATA).hexdigest()}, format='json',
+        )
+        self.assertEqual(response.status_code, 200)
+        download = self.client.get(f'/api/lessons/{self.lesson.pk}/file/')
+        self.assertEqual(b''.join(download.streaming_content), self.DATA)
+
+    def test_repeated_chunk_is_not_rewritten(self):
+        self.assertEqual(self.put_chunk(0).status_code, 200)
+        response = self.put_chunk(0, b'%PDF-' + b'z' * 3995)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data['received_chunks'], 1)
+        upload = LessonUpload.objects.get(pk=self.upload_id)
+        with open(upload.temp_path, 'rb') as stream:
+            self.assertEqual(stream.read(), self.DATA[:4000])
+
+    def test_mismatched_checksum_does_not_store_blob(self):
+        for index in range(self.total_chunks):
+            self.put_chunk(index)
+        response = self.client.post(
+            f'/api/lessons/uploads/{self.upload_id}/complete/', {'sha256': '0' * 64}, format='json',
+        )
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(self.stored_blobs(), [])
+        self.lesson.refresh_from_db()
+        self.assertIsNone(self.lesson.file_sha256)
+        self.assertEqual(LessonUpload.objects.get(pk=self.upload_id).status, 'pending')
+
+    def test_empty_chunk_body_is_rejected(self):
+        response = self.put_chunk(0, b'')
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(LessonUpload.objects.get(pk=self.upload_id).received_chunks, 0)
+
+    def test_chunks_and_completion_touch_updated_at(self):
+        past = timezone.now() - timedelta(days=2)
+        LessonUpload.objects.filter(pk=self.upload_id).update(updated_at=past)
+        Lesson.objects.filter(pk=self.lesson.pk).update(updated_at=past)
+
+        self.put_chunk(0)
+        # Una subida que sigue recibiendo partes no cuenta como inactiva
+        self.assertGreater(LessonUpload.objects.get(pk=self.upload_id).updated_at, past)
+
+        for index in range(1, self.total_chunks):
+            self.put_chunk(index)
+        self.client.post(
+            f'/api/lessons/uploads/{self.upload_id}/complete/',
+            {'sha256': hashlib.sha256(self.DATA).hexdigest()}, format='json',
+        )
+        self.lesson.refresh_from_db()
+        self.assertGreater(self.lesson.updated_at, past)
@@ -1,8 +1,21 @@
+from django.urls import path
 from rest_framework.routers import DefaultRouter
-from .views import LessonViewSet
+from .views import (
+    LessonViewSet,
+    LessonUploadCreateView,
+    LessonUploadDetailView,
+    LessonUploadChunkView,
+    LessonUploadCompleteView,
+)
 
 router = DefaultRouter()
 #/api/lessons/
 router.register(r'', LessonViewSet, basename='lesson')
 
-urlpatterns = router.urls
+# Deben ir antes del router para que 'uploads' no se tome como id de lección
+urlpatterns = [
+    path('uploads/', LessonUploadCreateView.as_view(), name='lesson-upload-create'),
+    path('uploads/<uuid:upload_id>/', LessonUploadDetailView.as_view(), name='lesson-upload-detail'),
+    path('uploads/<uuid:upload_id>/chunks/<int:index>/', LessonUploadChunkView.as_view(), name='lesson-upload-chunk'),
+    path('uploads/<uuid:upload_id>/complete/', LessonUploadCompleteView.as_view(), name='lesson-upload-complete'),
+] + router.urls
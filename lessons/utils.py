@@ -0,0 +1,75 @@
+import hashlib
+import os
+
+from core.storage import CHUNK_SIZE
+
+
+PDF_MAGIC = b'%PDF-'
+
+
+class ChunkError(Exception):
+    pass
+
+
+def file_digest(path):
+    """(sha256, tamaño) de un archivo leído por bloques."""
+    hasher = hashlib.sha256()
+    size = 0
+    with open(path, 'rb') as stream:
+        while True:
+            data = stream.read(CHUNK_SIZE)
+            if not data:
+                break
+            hasher.update(data)
+            size += len(data)
+    return hasher.hexdigest(), size
+
+
+def read_upload_chunk(upload, index, stream, checksum):
+    """
+    Lee en streaming desde `stream` la parte `index` de la subida y verifica
+    su tamaño, sus bytes mágicos y su SHA-256. Devuelve los bytes de la parte
+    (a lo sumo `chunk_size`), listos para `write_upload_chunk`.
+    """
+    if stream is None:
+        raise ChunkError(f'La parte {index} llegó sin contenido.')
+    expected = upload.chunk_length(index)
+    hasher = hashlib.sha256()
+    parts = []
+    written = 0
+    header = b''
+    while True:
+        # Se lee un byte más de lo esperado para detectar partes demasiado grandes
+        data = stream.read(min(CHUNK_SIZE, expected - written + 1))
+        if not data:
+            break
+        written += len(data)
+        if written > expected:
+            raise ChunkError(f'La parte {index} excede el tamaño esperado ({expected} bytes).')
+        if index == 0 and len(header) < len(PDF_MAGIC):
+            # Los bytes mágicos se validan en cuanto llegan, sin esperar al resto
+            header += data[:len(PDF_MAGIC) - len(header)]
+            if not PDF_MAGIC.startswith(header):
+                raise ChunkError('El archivo no es un PDF válido.')
+        hasher.update(data)
+        parts.append(data)
+    if written != expected:
+        raise ChunkError(f'La parte {index} debe tener {expected} bytes (recibidos {written}).')
+    if index == 0 and header != PDF_MAGIC:
+        raise ChunkError('El archivo no es un PDF válido.')
+    if hasher.hexdigest() != checksum.lower():
+        raise ChunkError(f'El checksum SHA-256 de la parte {index} no coincide.')
+    return b''.join(parts)
+
+
+def write_upload_chunk(upload, index, data):
+    """Escribe la parte `index` ya verificada en el archivo temporal de la subida."""
+    offset = index * upload.chunk_size
+    path = upload.temp_path
+    path.parent.mkdir(parents=True, exist_ok=True)
+    with open(path, 'r+b' if path.exists() else 'w+b') as out:
+        out.seek(offset)
+        out.truncate()
+        out.write(data)
+        out.flush()
+        os.fsync(out.fileno())
@@ -1,14 +1,47 @@
-from rest_framework import viewsets
+import io
+
+from rest_framework import viewsets, status
+from rest_framework.decorators import action
+from rest_framework.generics import get_object_or_404
+from rest_framework.pagination import CursorPagination
 from rest_framework.permissions import IsAuthenticated
-from rest_framework.exceptions import PermissionDenied
-from .models import Lesson
-from .serializers import LessonSerializer
-from courses.models import CourseSubscription
+from rest_framework.response import Response
+from rest_framework.views import APIView
+from rest_framework.exceptions import PermissionDenied, NotFound
+from django.conf import settings
+from django.core.exceptions import ValidationError as DjangoValidationError
+from django.db import transaction
+from django.db.models import F
+from django.http import FileResponse
+from django.utils import timezone
+from core.responses import add_validators, make_etag, not_modified, serve_blob
+from core.serializers import fieldset_key
+from core.storage import get_blob_storage
+from core.utils import decode_base64_file
+from .models import Lesson, LessonUpload
+from .serializers import LessonSerializer, LessonListSerializer, LessonContentSerializer, LessonUploadSerializer
+from .utils import ChunkError, file_digest, read_upload_chunk, write_upload_chunk
+from courses.subscriptions import get_subscribed_course_ids
+
+
+class LessonCursorPagination(CursorPagination):
+    page_size = 50
+    page_size_query_param = 'page_size'
+    max_page_size = 100
+    ordering = ('created_at', 'id')
 
 
 class LessonViewSet(viewsets.ModelViewSet):
     serializer_class = LessonSerializer
     permission_classes = [IsAuthenticated]
+    pagination_class = LessonCursorPagination
+
+    def get_serializer_class(self):
+        if self.action == 'list':
+            return LessonListSerializer
+        if self.action == 'content':
+            return LessonContentSerializer
+        return LessonSerializer
 
     def get_queryset(self):
         user = self.request.user
@@ -18,17 +51,39 @@ class LessonViewSet(viewsets.ModelViewSet):
         if role == '1':  # Profesor: ver solo sus cursos
             qs = Lesson.objects.filter(course__profesor=user)
         elif role == '2':  # Estudiante: ver cursos con suscripción activa
-            qs = Lesson.objects.filter(
-                course__subscriptions__user=user,
-                course__subscriptions__is_active=True,
-            )
+            qs = Lesson.objects.filter(course_id__in=get_subscribed_course_ids(self.request))
         else:
             qs = Lesson.objects.none()
 
         if course_id:
             qs = qs.filter(course_id=course_id)
+        qs = qs.with_file_flag()
+        if self.action == 'list':
+            # El listado solo necesita metadatos: nunca traer el base64 ni el contenido
+            qs = qs.defer('file', 'content')
+        elif self.action == 'content':
+            # has_file sale de la anotación: el base64 solo se lee al descargarlo
+            qs = qs.only('id', 'course_id', 'content', 'file_sha256', 'file_size')
+        elif self.action == 'file':
+            qs = qs.only('id', 'course_id', 'file', 'file_sha256', 'file_size')
+        elif self.action == 'retrieve':
+            # `file` es de solo escritura: el base64 nunca se lee al consultar
+            qs = LessonSerializer.narrow_queryset(qs, self.request).defer('file')
         return qs.order_by('created_at')
 
+    def retrieve(self, request, *args, **kwargs):
+        # Validación condicional con datos de versión, antes de cargar el contenido
+        version = get_object_or_404(
+            self.get_queryset().values('pk', 'updated_at', 'file_sha256'), pk=kwargs['pk']
+        )
+        etag = make_etag(
+            'lesson', version['pk'], version['updated_at'], version['file_sha256'], fieldset_key(request),
+        )
+        response = not_modified(request, etag, version['updated_at'])
+        if response is None:
+            response = super().retrieve(request, *args, **kwargs)
+        return add_validators(response, etag, version['updated_at'], 'private, max-age=0')
+
     def perform_create(self, serializer):
         if getattr(self.request.user, 'rol', None) != '1':
             raise PermissionDenied('Solo los profesores pueden crear lecciones.')
@@ -47,3 +102,169 @@ class LessonViewSet(viewsets.ModelViewSet):
         if getattr(self.request.user, 'rol', None) != '1' or instance.course.profesor != self.request.user:
             raise PermissionDenied('No tienes permiso para eliminar esta lección.')
         instance.delete()
+
+    @action(detail=True, methods=['get'])
+    def content(self, request, pk=None):
+        """Contenido completo de la lección y metadatos de su archivo."""
+        lesson = self.get_object()
+        serializer = self.get_serializer(lesson)
+        return Response(serializer.data)
+
+    @action(detail=True, methods=['get'], url_path='file')
+    def file(self, request, pk=None):
+        """Descarga en streaming del PDF de la lección (soporta HTTP Range)."""
+        lesson = self.get_object()
+        if not lesson.file_sha256 and lesson.file:
+            # Lecciones antiguas aún sin migrar (comando migrate_lesson_files): el
+            # base64 se decodifica en memoria, sin escribir durante un GET
+            try:
+                data = decode_base64_file(lesson.file)
+            except DjangoValidationError:
+                raise NotFound('El archivo de la lección está dañado.')
+            response = FileResponse(
+                io.BytesIO(data), content_type='application/pdf', filename=f'leccion-{lesson.pk}.pdf',
+            )
+            response['Cache-Control'] = 'private, max-age=3600'
+            return response
+        storage = get_blob_storage('lessons')
+        if not lesson.file_sha256 or not storage.exists(lesson.file_sha256):
+            raise NotFound('La lección no tiene archivo.')
+        return serve_blob(
+            request,
+            storage,
+            lesson.file_sha256,
+            content_type='application/pdf',
+            filename=f'leccion-{lesson.pk}.pdf',
+            cache_control='private, max-age=3600',
+        )
+
+
+class LessonUploadCreateView(APIView):
+    """Inicia una subida por partes del PDF de una lección."""
+    permission_classes = [IsAuthenticated]
+
+    def post(self, request):
+        if getattr(request.user, 'rol', None) != '1':
+            raise PermissionDenied('Solo los profesores pueden subir archivos de lecciones.')
+        serializer = LessonUploadSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        lesson = serializer.validated_data['lesson']
+        if lesson.course is None or lesson.course.profesor_id != request.user.id:
+            raise PermissionDenied('No tienes permiso para modificar esta lección.')
+        upload = serializer.save(user=request.user, chunk_size=settings.LESSON_UPLOAD_CHUNK_SIZE)
+        return Response(LessonUploadSerializer(upload).data, status=status.HTTP_201_CREATED)
+
+
+class LessonUploadMixin:
+    permission_classes = [IsAuthenticated]
+
+    def get_upload(self, request, upload_id, lock=False):
+        queryset = LessonUpload.objects.select_for_update() if lock else LessonUpload.objects.all()
+        return get_object_or_404(queryset, pk=upload_id, user=request.user)
+
+
+class LessonUploadDetailView(LessonUploadMixin, APIView):
+    """Estado de la subida: permite al cliente saber desde qué parte reanudar."""
+
+    def get(self, request, upload_id):
+        upload = self.get_upload(request, upload_id)
+        return Response(LessonUploadSerializer(upload).data)
+
+    def delete(self, request, upload_id):
+        upload = self.get_upload(request, upload_id)
+        upload.discard_temp_file()
+        upload.delete()
+        return Response(status=status.HTTP_204_NO_CONTENT)
+
+
+class LessonUploadChunkView(LessonUploadMixin, APIView):
+    """
+    Recibe una parte binaria (cuerpo crudo, sin JSON ni base64). La cabecera
+    X-Chunk-SHA256 debe traer el SHA-256 en hexadecimal de la parte.
+    """
+
+    def put(self, request, upload_id, index):
+        upload = self.get_upload(request, upload_id)
+        error = self.check_chunk(upload, index)
+        if error is not None:
+            return error
+        checksum = request.headers.get('X-Chunk-SHA256')
+        if not checksum:
+            return Response({'detail': 'Falta la cabecera X-Chunk-SHA256.'}, status=status.HTTP_400_BAD_REQUEST)
+        # El cuerpo se lee y verifica antes de bloquear la fila: un cliente lento
+        # no mantiene abierta la transacción
+        try:
+            data = read_upload_chunk(upload, index, request.stream, checksum)
+        except ChunkError as exc:
+            return Response({'detail': str(exc)}, status=status.HTTP_400_BAD_REQUEST)
+
+        # La fila queda bloqueada mientras se escribe: dos PUT de la misma parte
+        # no pueden escribir a la vez en el archivo temporal
+        with transaction.atomic():
+            upload = self.get_upload(request, upload_id, lock=True)
+            error = self.check_chunk(upload, index)
+            if error is not None:
+                return error
+            write_upload_chunk(upload, index, data)
+            # updated_at marca la última actividad (purge_lesson_uploads)
+            LessonUpload.objects.filter(pk=upload.pk).update(
+                received_chunks=F('received_chunks') + 1, updated_at=timezone.now(),
+            )
+        upload.refresh_from_db()
+        return Response(LessonUploadSerializer(upload).data, status=status.HTTP_200_OK)
+
+    def check_chunk(self, upload, index):
+        """Respuesta de error si la parte no puede escribirse ahora; None si puede."""
+        if upload.status != 'pending':
+            return Response({'detail': 'La subida ya fue completada.'}, status=status.HTTP_409_CONFLICT)
+        if index >= upload.total_chunks:
+            return Response({'detail': 'Índice de parte fuera de rango.'}, status=status.HTTP_400_BAD_REQUEST)
+        if index < upload.received_chunks:
+            # Reintento de una parte ya confirmada: no se vuelve a escribir
+            return Response(LessonUploadSerializer(upload).data, status=status.HTTP_200_OK)
+        if index > upload.received_chunks:
+            return Response(
+                {'detail': f'Se esperaba la parte {upload.received_chunks}.', 'next_chunk': upload.received_chunks},
+                status=status.HTTP_409_CONFLICT,
+            )
+        return None
+
+
+class LessonUploadCompleteView(LessonUploadMixin, APIView):
+    """Cierra la subida, la mueve al almacenamiento de blobs y la asocia a la lección."""
+
+    def post(self, request, upload_id):
+        with transaction.atomic():
+            upload = self.get_upload(request, upload_id, lock=True)
+            if upload.status != 'pending':
+                return Response({'detail': 'La subida ya fue completada.'}, status=status.HTTP_409_CONFLICT)
+            if upload.received_chunks < upload.total_chunks:
+                return Response(
+                    {'detail': 'Faltan partes por subir.', 'next_chunk': upload.received_chunks},
+                    status=status.HTTP_400_BAD_REQUEST,
+                )
+
+            # Se verifica el archivo completo antes de escribir el blob: una
+            # subida que no coincide no deja blobs huérfanos
+            digest, size = file_digest(upload.temp_path)
+            expected_sha = request.data.get('sha256')
+            if size != upload.total_size or (expected_sha and expected_sha.lower() != digest):
+                return Response(
+                    {'detail': 'El archivo recibido no coincide con el esperado.'},
+                    status=status.HTTP_400_BAD_REQUEST,
+                )
+
+            lesson = upload.lesson
+            with open(upload.temp_path, 'rb') as stream:
+                lesson.attach_file(stream)
+            lesson.save(update_fields=['file', 'file_sha256', 'file_size', 'updated_at'])
+            upload.status = 'completed'
+            upload.save(update_fields=['status', 'updated_at'])
+        upload.discard_temp_file()
+        return Response(
+            {
+                'message': 'Archivo subido correctamente',
+                'lesson': LessonContentSerializer(lesson, context={'request': request}).data,
+            },
+            status=status.HTTP_200_OK,
+        )